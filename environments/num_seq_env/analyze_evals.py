@@ -1,156 +1,195 @@
-"""Load eval results across models, verify consistency, and extract completions."""
+"""Stream eval results across models, verify consistency, and report format errors.
 
+Records are parsed one line at a time and never held together, so memory
+stays flat no matter how many examples or how long the completions are.
+Prompts and answers are compared through hash fingerprints, and format
+errors are spooled to temporary files until the report is assembled.
+"""
+
+import hashlib
 import json
 import re
+import tempfile
+from collections.abc import Iterator
 from pathlib import Path
 
 EVALS_DIR = Path(__file__).parent / "outputs" / "evals"
+OUTPUT_FILE = Path(__file__).parent / "format_errors.txt"
+
+FINGERPRINT_MASK = (1 << 128) - 1
 
+answer_pattern = re.compile(r"<answer>\s*(.*?)\s*</answer>", re.DOTALL)
+boxed_pattern = re.compile(r"\\boxed\{(.+?)\}", re.DOTALL)
 
-def load_results() -> dict[str, list[dict]]:
-    """Load results.jsonl from each model subfolder. Returns {model_name: [records]}."""
-    model_results = {}
+
+def find_results() -> dict[str, Path]:
+    """Locate results.jsonl for each model subfolder. Returns {model_name: path}."""
+    model_files = {}
     for model_dir in sorted(EVALS_DIR.iterdir()):
         if not model_dir.is_dir():
             continue
-        model_name_list = model_dir.name.split('--')
-        model_name = model_name_list[1] + '/' + model_name_list[2]
+        # <env>--<model with "/" as "--">; aliases like gpt-4.1 have no "/"
+        model_name = '/'.join(model_dir.name.split('--')[1:])
         # Each model dir has one hash-named subfolder containing results.jsonl
         jsonl_files = list(model_dir.glob("*/results.jsonl"))
         if len(jsonl_files) != 1:
             raise FileNotFoundError(f"Expected 1 results.jsonl in {model_dir}, found {len(jsonl_files)}")
-        records = []
-        with open(jsonl_files[0]) as f:
-            for line in f:
-                records.append(json.loads(line))
-        # Sort by example_id for consistent ordering
-        records.sort(key=lambda r: r["example_id"])
-        model_results[model_name] = records
-    return model_results
-
-
-def verify_consistency(model_results: dict[str, list[dict]]) -> None:
-    """Verify that prompts and answers match across all models for each example_id."""
-    models = list(model_results.keys())
-    ref_model = models[0]
-    ref_records = model_results[ref_model]
+        model_files[model_name] = jsonl_files[0]
+    return model_files
 
-    # Check all models have the same number of examples
-    for model in models:
-        n = len(model_results[model])
-        assert n == len(ref_records), f"{model} has {n} examples, expected {len(ref_records)}"
 
-    # Check example_ids, prompts, and answers match
-    mismatches = []
-    for i, ref_rec in enumerate(ref_records):
-        eid = ref_rec["example_id"]
-        for model in models[1:]:
-            rec = model_results[model][i]
-            if rec["example_id"] != eid:
-                mismatches.append(f"  example index {i}: {ref_model} has id={eid}, {model} has id={rec['example_id']}")
-                continue
-            if rec["prompt"] != ref_rec["prompt"]:
-                mismatches.append(f"  example_id={eid}: prompt mismatch between {ref_model} and {model}")
-            if rec["answer"] != ref_rec["answer"]:
-                mismatches.append(f"  example_id={eid}: answer mismatch between {ref_model} and {model}")
+def iter_records(path: Path) -> Iterator[dict]:
+    """Parse a results.jsonl one record at a time, in the order they were written."""
+    with open(path) as f:
+        for line in f:
+            yield json.loads(line)
 
-    if mismatches:
-        raise ValueError("Consistency check failed:\n" + "\n".join(mismatches))
 
+def fingerprint(rec: dict) -> int:
+    """128-bit hash of a record's example_id, prompt and answer."""
+    blob = json.dumps([rec["example_id"], rec["prompt"], rec["answer"]], sort_keys=True)
+    return int.from_bytes(hashlib.blake2b(blob.encode(), digest_size=16).digest(), "little")
 
-def extract_completions(model_results: dict[str, list[dict]]) -> dict[str, dict[int, str]]:
-    """Extract completion content per model per example_id.
-
-    Returns {model_name: [list of completions]}.
-    """
-    completions = {}
-    for model, records in model_results.items():
-        completions[model] = []
-        for rec in records:
-            # completion is a list of message dicts; extract the assistant content
-            comp_messages = rec["completion"]
-            content = "\n".join(msg["content"] for msg in comp_messages if msg.get("content") is not None)
-            completions[model].append(content)
-    return completions
 
+def completion_text(rec: dict) -> str:
+    """Join the content of every completion message."""
+    return "\n".join(msg["content"] for msg in rec["completion"] if msg.get("content") is not None)
 
-def extract_rewards(model_results: dict[str, list[dict]]) -> dict[str, dict[int, float]]:
-    """Extract reward per model per example_id.
 
-    Returns {model_name: [list of rewards]}.
+def locate_mismatches(model_files: dict[str, Path]) -> list[str]:
+    """Second pass, only after a fingerprint mismatch: name the differing examples."""
+    models = list(model_files)
+    ref_model = models[0]
+    ref = {rec["example_id"]: fingerprint(rec) for rec in iter_records(model_files[ref_model])}
+    mismatches = []
+    for model in models[1:]:
+        ids = set()
+        for rec in iter_records(model_files[model]):
+            eid = rec["example_id"]
+            ids.add(eid)
+            if eid not in ref:
+                mismatches.append(f"  example_id={eid}: present in {model} but not {ref_model}")
+            elif fingerprint(rec) != ref[eid]:
+                mismatches.append(f"  example_id={eid}: prompt/answer mismatch between {ref_model} and {model}")
+        for eid in sorted(ref.keys() - ids):
+            mismatches.append(f"  example_id={eid}: present in {ref_model} but not {model}")
+    return mismatches
+
+
+class Spool:
+    """Completions written to a temporary file as they arrive, read back by example_id.
+
+    Evals append records in completion order, so each completion is kept with
+    its example_id and byte span and the report reads them back sorted;
+    rollouts of one example keep their arrival order. The file is binary so
+    completions come back byte for byte, "\\r\\n" included.
     """
-    rewards = {}
-    for model, records in model_results.items():
-        rewards[model] = [rec["reward"] for rec in records]
-    return rewards
 
-
-OUTPUT_FILE = Path(__file__).parent / "format_errors.txt"
+    def __init__(self):
+        self.file = tempfile.TemporaryFile("w+b")
+        self.spans: list[tuple[int, int, int, int]] = []
+        self.offset = 0
+
+    def add(self, completion: str, example_id: int = 0) -> None:
+        data = completion.encode("utf-8")
+        self.file.write(data)
+        self.spans.append((example_id, len(self.spans), self.offset, len(data)))
+        self.offset += len(data)
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def __iter__(self) -> Iterator[str]:
+        for _, _, offset, size in sorted(self.spans):
+            self.file.seek(offset)
+            yield self.file.read(size).decode("utf-8")
+
+
+class ModelReport:
+    """Running format-error statistics for one model."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.total = 0
+        self.unparseable = 0
+        self.empty = 0
+        self.fingerprint = 0
+        self.errors = Spool()
+        self.non_boxed = Spool()
+
+    def add(self, rec: dict) -> None:
+        self.total += 1
+        self.fingerprint = (self.fingerprint + fingerprint(rec)) & FINGERPRINT_MASK
+        completion = completion_text(rec)
+        # Count completions where <answer>...</answer> tags could not be parsed
+        if answer_pattern.search(completion):
+            return
+        self.unparseable += 1
+        if completion == "":
+            self.empty += 1
+            return
+        self.errors.add(completion, rec["example_id"])
+        if not boxed_pattern.search(completion):
+            self.non_boxed.add(completion, rec["example_id"])
 
 
 if __name__ == "__main__":
-    model_results = load_results()
-    verify_consistency(model_results)
-
-    completions = extract_completions(model_results)
-    rewards = extract_rewards(model_results)
-    format_errors = {m: [] for m in completions.keys()}
-
-    # Count completions where <answer>...</answer> tags could not be parsed
-    answer_pattern = re.compile(r"<answer>\s*(.*?)\s*</answer>", re.DOTALL)
+    model_files = find_results()
+    reports = {}
+    for model, path in model_files.items():
+        report = ModelReport(model)
+        for rec in iter_records(path):
+            report.add(rec)
+        reports[model] = report
+
+    # Prompts and answers match across models iff the multisets of record
+    # fingerprints do; sums of 128-bit hashes compare them in O(1) memory.
+    ref_model = next(iter(reports))
+    for model, report in reports.items():
+        assert report.total == reports[ref_model].total, (
+            f"{model} has {report.total} examples, expected {reports[ref_model].total}"
+        )
+    if len({report.fingerprint for report in reports.values()}) > 1:
+        raise ValueError("Consistency check failed:\n" + "\n".join(locate_mismatches(model_files)))
 
     with open(OUTPUT_FILE, "w") as f:
-        f.write(f"Loaded results for {len(model_results)} models: {', '.join(model_results.keys())}\n\n")
+        f.write(f"Loaded results for {len(reports)} models: {', '.join(reports.keys())}\n\n")
 
         f.write("Format failures (no <answer> tag parsed) per model:\n")
-        for model in sorted(completions):
-            unparseable = 0
-            for completion in completions[model]:
-                if not answer_pattern.search(completion):
-                    unparseable += 1
-                    format_errors[model].append(completion)
-            total = len(completions[model])
-            f.write(f"  {model}: {unparseable}/{total} completions could not be parsed\n")
-
-        for model in sorted(format_errors):
-            completions_with_format_errors = format_errors[model]
-            if not len(completions_with_format_errors):
+        for model in sorted(reports):
+            report = reports[model]
+            f.write(f"  {model}: {report.unparseable}/{report.total} completions could not be parsed\n")
+
+        for model in sorted(reports):
+            report = reports[model]
+            if not report.unparseable:
                 continue
-            empty_ct = sum(1 for c in completions_with_format_errors if c == "")
-            non_empty_ct = len(completions_with_format_errors) - empty_ct
+            non_empty_ct = len(report.errors)
             f.write(f"\n{'=' * 80}\n")
-            f.write(f"Format errors for {model} ({len(completions_with_format_errors)} total: {empty_ct} empty, {non_empty_ct} non-empty)\n")
+            f.write(f"Format errors for {model} ({report.unparseable} total: {report.empty} empty, {non_empty_ct} non-empty)\n")
             f.write(f"{'=' * 80}\n")
-            j = 0
-            for completion in completions_with_format_errors:
-                if completion == "":
-                    continue
-                j += 1
+            for j, completion in enumerate(report.errors, 1):
                 f.write(f"\n--- [{model}] error {j}/{non_empty_ct} ---\n")
                 f.write(completion + "\n")
 
         # Check how many intellect-3 non-empty format errors used \boxed{}
         intellect_key = "prime-intellect/intellect-3"
-        if intellect_key in format_errors:
-            non_empty = [c for c in format_errors[intellect_key] if c != ""]
-            boxed_pattern = re.compile(r"\\boxed\{(.+?)\}", re.DOTALL)
-            boxed_ct = sum(1 for c in non_empty if boxed_pattern.search(c))
-            non_boxed_non_empty = [c for c in non_empty if not boxed_pattern.search(c)]
+        if intellect_key in reports:
+            report = reports[intellect_key]
+            non_empty_ct = len(report.errors)
+            non_boxed_non_empty_ct = len(report.non_boxed)
+            boxed_ct = non_empty_ct - non_boxed_non_empty_ct
             f.write(f"\n{'=' * 80}\n")
             f.write(f"\\boxed analysis for {intellect_key}\n")
             f.write(f"{'=' * 80}\n")
-            f.write(f"  Non-empty format errors: {len(non_empty)}\n")
-            f.write(f"  Contained \\boxed{{}}: {boxed_ct}/{len(non_empty)}\n")
-            f.write(f"  Neither <answer> nor \\boxed{{}}: {len(non_empty) - boxed_ct}/{len(non_empty)}\n")
-            j = 0
-            non_boxed_non_empty_ct = len(non_empty) - boxed_ct
-            if  non_boxed_non_empty_ct:
+            f.write(f"  Non-empty format errors: {non_empty_ct}\n")
+            f.write(f"  Contained \\boxed{{}}: {boxed_ct}/{non_empty_ct}\n")
+            f.write(f"  Neither <answer> nor \\boxed{{}}: {non_boxed_non_empty_ct}/{non_empty_ct}\n")
+            if non_boxed_non_empty_ct:
                 f.write(f"\n{'=' * 80}\n")
                 f.write(f"Non-boxed non-empty format errors for {intellect_key}\n")
                 f.write(f"{'=' * 80}\n")
-                for completion in non_boxed_non_empty:
-                    j += 1
+                for j, completion in enumerate(report.non_boxed, 1):
                     f.write(f"\n--- [{intellect_key}] non-boxed non-empty format error {j}/{non_boxed_non_empty_ct} ---\n")
                     f.write(completion + "\n")
     print(f"Output written to {OUTPUT_FILE}")
-
@@ -0,0 +1,317 @@
+"""Benchmark suite for dataset generation, rendering, filtering and scoring, with tracked baselines.
+
+Each benchmark is timed over several samples and reports the fastest time
+per call. Results are compared with benchmark_baseline.json, and the run
+fails (exit status 1) when a benchmark is slower than its baseline by more
+than its tolerance. Shared machines have bursts of slowness, so a
+benchmark over its threshold is measured again, up to RETRIES times, and
+only counts as a regression if every attempt is. Baselines are
+machine-specific: after a deliberate performance change, or on a new
+machine, record fresh ones with --update.
+
+Benchmarks in BUDGETS also have an absolute time limit that holds on any
+machine and is not moved by --update. The cold-start import budget keeps
+`import num_seq_env` fast, and its snippet fails outright if the import
+pulls in verifiers or datasets.
+
+The answer_extraction benchmarks time extract_answer against
+vf.XMLParser.parse_answer on the stored eval completions, as saved and
+padded with long reasoning. --compare-parsers also reports the accuracy
+each parser gives them and how many rewards differ.
+
+    python benchmarks.py
+    python benchmarks.py -k generate --samples 5
+    python benchmarks.py --update
+    python benchmarks.py -k answer_extraction --compare-parsers
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+
+from num_seq_env import (
+    _COEFF_POOL,
+    _UNIT_ROOT_VERDICTS,
+    _batched_det,
+    _det,
+    _generate_dataset,
+    _has_unit_roots,
+    _hankel_det,
+    extract_answer,
+    render_prompts,
+    score_completions,
+)
+
+ENV_DIR = Path(__file__).parent
+EVALS_DIR = ENV_DIR / "outputs" / "evals"
+BASELINE_FILE = ENV_DIR / "benchmark_baseline.json"
+DEFAULT_TOLERANCE = 0.25
+# A sample loops the benchmark until it runs at least this long.
+MIN_SAMPLE_S = 0.2
+RETRIES = 2
+# Absolute limits in seconds, including interpreter startup.
+BUDGETS = {"cold_start/import": 0.5}
+LAZY_MODULES = ("verifiers", "datasets")
+# Padded completions get this many characters of extra reasoning, to mimic
+# long thinking-model traces.
+PADDED_CHARS = 32_000
+
+
+def real_completions() -> tuple[list, list[str]]:
+    """Every (completion, answer) pair from the stored evals."""
+    completions, answers = [], []
+    for path in sorted(EVALS_DIR.glob("*/*/results.jsonl")):
+        with open(path) as f:
+            for line in f:
+                rec = json.loads(line)
+                completions.append(rec["completion"])
+                answers.append(rec["answer"])
+    return completions, answers
+
+
+def pad(completion: list[dict]) -> list[dict]:
+    """Prepend filler reasoning to the first assistant message."""
+    filler = "Let me reconsider the recurrence once more. " * (PADDED_CHARS // 44)
+    padded = [dict(msg) for msg in completion]
+    for msg in padded:
+        if msg.get("role") == "assistant" and msg.get("content"):
+            msg["content"] = filler + msg["content"]
+            break
+    return padded
+
+
+def xml_parser():
+    import verifiers as vf
+
+    return vf.XMLParser(["reasoning", "answer"])
+
+
+def bench_generate(num_examples: int, min_k: int, max_k: int) -> Callable[[], object]:
+    return lambda: _generate_dataset(num_examples=num_examples, seed=42, min_k=min_k, max_k=max_k)
+
+
+def bench_render(num_examples: int) -> Callable[[], object]:
+    dataset = _generate_dataset(num_examples=num_examples, seed=42)
+    return lambda: render_prompts(dataset)
+
+
+def bench_det(n: int) -> Callable[[], object]:
+    rng = np.random.default_rng(n)
+    matrix = rng.integers(-100_000, 100_001, (n, n)).tolist()
+    return lambda: _det(matrix)
+
+
+def bench_batched_det(n: int, batch: int = 1024) -> Callable[[], object]:
+    rng = np.random.default_rng(n)
+    matrices = rng.integers(-100_000, 100_001, (batch, n, n))
+    return lambda: _batched_det(matrices)
+
+
+def bench_hankel_det(k: int) -> Callable[[], object]:
+    seq = [1, 2]
+    while len(seq) < 2 * k:
+        seq.append(3 * seq[-1] - 2 * seq[-2] + len(seq))
+    return lambda: _hankel_det(seq, k)
+
+
+def bench_unit_roots(k: int, cached: bool) -> Callable[[], object]:
+    rng = np.random.default_rng(k)
+    coeffs = [rng.choice(_COEFF_POOL, k).tolist() for _ in range(256)]
+
+    def run():
+        if not cached:
+            _UNIT_ROOT_VERDICTS.clear()
+        for c in coeffs:
+            _has_unit_roots(c)
+
+    return run
+
+
+def bench_cold_start(snippet: str) -> Callable[[], object]:
+    """A fresh interpreter running `snippet` in this directory."""
+    command = [sys.executable, "-c", snippet]
+    return lambda: subprocess.run(command, cwd=ENV_DIR, check=True, capture_output=True)
+
+
+def bench_scoring() -> Callable[[], object] | None:
+    completions, answers = real_completions()
+    if not completions:
+        return None
+    return lambda: score_completions(completions, answers)
+
+
+def bench_answer_extraction(parser: str, padded: bool) -> Callable[[], object] | None:
+    completions, _ = real_completions()
+    if not completions:
+        return None
+    if padded:
+        completions = [pad(completion) for completion in completions]
+    parse = extract_answer if parser == "extract_answer" else xml_parser().parse_answer
+
+    def run():
+        for completion in completions:
+            parse(completion)
+
+    return run
+
+
+def compare_parsers() -> None:
+    """Accuracy on the stored evals with XMLParser and with extract_answer."""
+    completions, answers = real_completions()
+    if not completions:
+        print("No stored evals to compare parsers on")
+        return
+    parser = xml_parser()
+    xml_rewards = [
+        1.0 if (p := parser.parse_answer(c)) is not None and p.strip() == a.strip() else 0.0
+        for c, a in zip(completions, answers)
+    ]
+    rewards = score_completions(completions, answers)
+    print(f"{len(completions)} completions from {EVALS_DIR}")
+    print(f"Accuracy with XMLParser:      {sum(xml_rewards) / len(completions):.3f}")
+    print(f"Accuracy with extract_answer: {sum(rewards) / len(completions):.3f}")
+    print(f"Rewards that differ: {sum(x != y for x, y in zip(xml_rewards, rewards))}")
+
+
+BENCHMARKS: dict[str, Callable[[], Callable[[], object] | None]] = {
+    **{
+        f"generate/n={n},k={lo}-{hi}": lambda n=n, lo=lo, hi=hi: bench_generate(n, lo, hi)
+        for n, lo, hi in [(100, 2, 5), (500, 2, 5), (2000, 2, 5), (500, 2, 3), (500, 5, 5)]
+    },
+    "render_prompts/n=2000": lambda: bench_render(2000),
+    **{f"det/n={n}": lambda n=n: bench_det(n) for n in (2, 3, 5, 8)},
+    **{f"batched_det/n={n},batch=1024": lambda n=n: bench_batched_det(n) for n in (3, 5)},
+    **{f"hankel_det/k={k}": lambda k=k: bench_hankel_det(k) for k in (2, 3, 4, 5)},
+    **{
+        f"unit_roots/k={k},{'cached' if cached else 'cold'},x256": (
+            lambda k=k, cached=cached: bench_unit_roots(k, cached)
+        )
+        for k in (2, 5)
+        for cached in (False, True)
+    },
+    "cold_start/import": lambda: bench_cold_start(
+        f"import sys, num_seq_env; assert not {{*{LAZY_MODULES!r}}} & sys.modules.keys()"
+    ),
+    "cold_start/load_environment": lambda: bench_cold_start(
+        "import num_seq_env; num_seq_env.load_environment(num_examples=100, cache=False)"
+    ),
+    "scoring/exact_match,real_completions": bench_scoring,
+    **{
+        f"answer_extraction/{parser}{',padded' if padded else ''}": (
+            lambda parser=parser, padded=padded: bench_answer_extraction(parser, padded)
+        )
+        for parser in ("xml_parser", "extract_answer")
+        for padded in (False, True)
+    },
+}
+
+
+def measure(fn: Callable[[], object], samples: int) -> float:
+    """Fastest per-call time over `samples` samples of at least MIN_SAMPLE_S each."""
+    fn()  # warm up caches and lazy imports
+    start = time.perf_counter()
+    fn()
+    once = time.perf_counter() - start
+    loops = max(1, int(MIN_SAMPLE_S / max(once, 1e-9)))
+    best = once
+    for _ in range(samples):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g}{unit}"
+    return f"{seconds / 1e-9:.3g}ns"
+
+
+def machine() -> dict:
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+    }
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("-k", "--filter", default="", help="only run benchmarks whose name contains this")
+    arg_parser.add_argument("--samples", type=int, default=3)
+    arg_parser.add_argument("--update", action="store_true", help="record the results as the new baselines")
+    arg_parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    arg_parser.add_argument("--compare-parsers", action="store_true", help="also compare accuracy with XMLParser")
+    args = arg_parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"benchmarks": {}}
+    recorded = baseline["benchmarks"]
+    if baseline.get("machine") not in (None, machine()):
+        print(f"Note: baselines were recorded on {baseline['machine']}\n")
+
+    regressions, over_budget = [], []
+    print(f"{'benchmark':<40} {'time':>9} {'baseline':>9} {'ratio':>6}")
+    for name, setup in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        fn = setup()
+        if fn is None:
+            print(f"{name:<40} {'skipped (no data)':>26}")
+            continue
+        seconds = measure(fn, args.samples)
+        entry = recorded.get(name)
+        if entry is None:
+            print(f"{name:<40} {format_seconds(seconds):>9} {'-':>9} {'-':>6}")
+        else:
+            tolerance = entry.get("tolerance", DEFAULT_TOLERANCE)
+            for _ in range(RETRIES):
+                if seconds <= entry["seconds"] * (1 + tolerance):
+                    break
+                seconds = min(seconds, measure(fn, args.samples))
+            ratio = seconds / entry["seconds"]
+            flag = "  REGRESSION" if ratio > 1 + tolerance else ""
+            print(
+                f"{name:<40} {format_seconds(seconds):>9} "
+                f"{format_seconds(entry['seconds']):>9} {ratio:>5.2f}x{flag}"
+            )
+            if flag:
+                regressions.append(name)
+        budget = BUDGETS.get(name)
+        if budget is not None:
+            for _ in range(RETRIES):
+                if seconds <= budget:
+                    break
+                seconds = min(seconds, measure(fn, args.samples))
+            within = seconds <= budget
+            print(f"{'':<40} budget {format_seconds(budget)}: {'ok' if within else 'OVER BUDGET'}")
+            if not within:
+                over_budget.append(name)
+        if args.update:
+            recorded[name] = {
+                "seconds": seconds,
+                "tolerance": (entry or {}).get("tolerance", DEFAULT_TOLERANCE),
+            }
+
+    if args.update:
+        baseline["machine"] = machine()
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"\nBaselines written to {args.baseline}")
+    elif regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than baseline beyond tolerance")
+    if args.compare_parsers:
+        print()
+        compare_parsers()
+    if over_budget:
+        print(f"\n{len(over_budget)} benchmark(s) over their time budget: {', '.join(over_budget)}")
+    if over_budget or (regressions and not args.update):
+        sys.exit(1)
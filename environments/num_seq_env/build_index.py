@@ -0,0 +1,126 @@
+"""Build the on-disk valid-recurrence index read by load_environment(index_dir=...)."""
+
+import argparse
+import itertools
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from num_seq_env import (
+    _COEFF_POOL,
+    _INDEX_VERSION,
+    _INIT_RANGE,
+    _MAX_ABS_VALUE,
+    _MAX_LOOKAHEAD,
+    _companion_unit_roots,
+    _hankel_nonsingular,
+    _simulate_batch,
+    _unroll,
+)
+
+INDEX_DIR = Path(__file__).parent / "index"
+
+# Entries admitting at least this fraction of all (inits, start_idx) pairs
+# are sampled by rejection instead of storing their region explicitly.
+DENSE_FRACTION = 1 / 16
+
+# Candidate (coeffs, inits) rows unrolled per batch.
+CHUNK_ROWS = 1 << 18
+
+
+def build_order(k: int, max_k: int, max_start_idx: int) -> dict[str, np.ndarray]:
+    """Enumerate every (coeffs, inits) pair of order k and summarize its region.
+
+    A pair admits start_idx = 1..n, where n is limited by how many leading
+    terms stay within _MAX_ABS_VALUE. The Hankel check only needs to run at
+    offset 0: shifting the window by s multiplies the determinant by
+    (+/- c_k)^s, which is never zero.
+    """
+    all_coeffs = np.array(list(itertools.product(_COEFF_POOL, repeat=k)), dtype=np.int64)
+    all_coeffs = all_coeffs[~_companion_unit_roots(all_coeffs.astype(np.float64))]
+    all_inits = np.array(list(itertools.product(_INIT_RANGE, repeat=k)), dtype=np.int64)
+    num_inits = len(all_inits)
+    # start_idx = s needs terms 1 .. s + span
+    span = 2 * max_k + 1 + _MAX_LOOKAHEAD - 1
+    cap = max_start_idx + span
+    dense_weight = DENSE_FRACTION * num_inits * max_start_idx
+
+    coeffs_out, weights_out, dense_out = [], [], []
+    sizes, region_inits, region_starts = [], [], []
+    per_chunk = max(1, CHUNK_ROWS // num_inits)
+    for lo in range(0, len(all_coeffs), per_chunk):
+        chunk = all_coeffs[lo : lo + per_chunk]
+        coeffs = np.repeat(chunk, num_inits, axis=0)
+        inits = np.tile(all_inits, (len(chunk), 1))
+        ks = np.full(len(coeffs), k)
+        bounded = _unroll(coeffs, inits, ks, np.full(len(coeffs), cap), _MAX_ABS_VALUE)
+        n_starts = np.clip(bounded - span, 0, max_start_idx)
+
+        live = np.flatnonzero(n_starts)
+        head, _ = _simulate_batch(
+            coeffs[live], inits[live], ks[live],
+            np.full(live.size, 2 * k - 1), _MAX_ABS_VALUE,
+        )
+        singular = ~_hankel_nonsingular(head, np.zeros(live.size, dtype=np.int64), k)
+        n_starts[live[singular]] = 0
+
+        n_starts = n_starts.reshape(len(chunk), num_inits)
+        weights = n_starts.sum(axis=1)
+        for row in np.flatnonzero(weights).tolist():
+            dense = weights[row] >= dense_weight
+            coeffs_out.append(chunk[row])
+            weights_out.append(weights[row])
+            dense_out.append(dense)
+            admissible = np.zeros(0, dtype=np.int64) if dense else np.flatnonzero(n_starts[row])
+            sizes.append(admissible.size)
+            region_inits.append(admissible)
+            region_starts.append(n_starts[row, admissible])
+
+    offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    return {
+        "coeffs": np.array(coeffs_out, dtype=np.int8).reshape(-1, k),
+        "weights": np.array(weights_out, dtype=np.int64),
+        "dense": np.array(dense_out, dtype=bool),
+        "offsets": offsets,
+        "inits": np.concatenate(region_inits).astype(np.uint16),
+        "starts": np.concatenate(region_starts).astype(np.uint8),
+    }
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--out", type=Path, default=INDEX_DIR)
+    arg_parser.add_argument("--min-k", type=int, default=2)
+    arg_parser.add_argument("--max-k", type=int, default=5)
+    arg_parser.add_argument("--max-start-idx", type=int, default=24)
+    args = arg_parser.parse_args()
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    orders = list(range(args.min_k, args.max_k + 1))
+    for k in orders:
+        t0 = time.perf_counter()
+        arrays = build_order(k, args.max_k, args.max_start_idx)
+        for name, array in arrays.items():
+            np.save(args.out / f"k{k}_{name}.npy", array)
+        print(
+            f"k={k}: {len(arrays['weights'])} coefficient vectors "
+            f"({int(arrays['dense'].sum())} dense), {len(arrays['inits'])} stored pairs, "
+            f"{time.perf_counter() - t0:.1f}s"
+        )
+
+    meta = {
+        "version": _INDEX_VERSION,
+        "orders": orders,
+        "max_k": args.max_k,
+        "max_start_idx": args.max_start_idx,
+        "coeff_pool": _COEFF_POOL,
+        "init_range": [_INIT_RANGE.start, _INIT_RANGE.stop],
+        "max_abs_value": _MAX_ABS_VALUE,
+        "max_lookahead": _MAX_LOOKAHEAD,
+        "dense_fraction": DENSE_FRACTION,
+    }
+    (args.out / "meta.json").write_text(json.dumps(meta, indent=2))
+    print(f"Index written to {args.out}")
@@ -1,25 +1,107 @@
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import functools
+import hashlib
+import io
+import itertools
+import json
+import logging
+import math
+import multiprocessing
+import os
+import pstats
 import random
+import re
+import shutil
+import tempfile
+import time
+from collections import deque
+from collections.abc import Iterator
+from fractions import Fraction
+from pathlib import Path
+from typing import TYPE_CHECKING
 
 import numpy as np
-import verifiers as vf
-from datasets import Dataset
+
+# verifiers (which pulls in datasets, openai and friends) is most of the
+# import time, so it and datasets are imported where they are first needed.
+if TYPE_CHECKING:
+    import verifiers as vf
+    from datasets import Dataset
+
+logger = logging.getLogger("verifiers.envs.num_seq_env")
 
 
 def _det(matrix: list[list[int]]) -> int:
-    """Exact integer determinant via cofactor expansion (fine for n <= 5)."""
-    n = len(matrix)
-    if n == 1:
-        return matrix[0][0]
-    if n == 2:
-        return matrix[0][0] * matrix[1][1] - matrix[0][1] * matrix[1][0]
-    result = 0
-    for col in range(n):
-        minor = [
-            [matrix[r][c] for c in range(n) if c != col] for r in range(1, n)
-        ]
-        sign = 1 if col % 2 == 0 else -1
-        result += sign * matrix[0][col] * _det(minor)
-    return result
+    """Exact integer determinant via fraction-free (Bareiss) elimination.
+
+    Every intermediate entry is a minor of `matrix`, so the divisions are
+    exact and the cost is O(n^3) integer operations.
+    """
+    m = [list(row) for row in matrix]
+    n = len(m)
+    sign = 1
+    prev = 1
+    for p in range(n - 1):
+        if m[p][p] == 0:
+            swap = next((r for r in range(p + 1, n) if m[r][p] != 0), None)
+            if swap is None:
+                return 0
+            m[p], m[swap] = m[swap], m[p]
+            sign = -sign
+        pivot = m[p][p]
+        for i in range(p + 1, n):
+            for j in range(p + 1, n):
+                m[i][j] = (m[i][j] * pivot - m[i][p] * m[p][j]) // prev
+        prev = pivot
+    return sign * m[n - 1][n - 1]
+
+
+def _batched_det(matrices: np.ndarray) -> np.ndarray:
+    """Exact determinants of a stack of (n, n) integer matrices via Bareiss.
+
+    Each elimination step forms products of two minors before the exact
+    division, so the batch runs in int64 only when twice the squared
+    Hadamard bound fits; otherwise it falls back to object arrays of Python
+    ints, which stay exact for any magnitude.
+    """
+    batch, n, _ = matrices.shape
+    if batch == 0:
+        return np.zeros(0, dtype=object)
+    peak = int(np.abs(matrices).max())
+    hadamard = math.isqrt(n * peak * peak) + 1
+    dtype = np.int64 if 2 * hadamard ** (2 * n) < 2**63 else object
+    m = matrices.astype(dtype)
+    rows = np.arange(batch)
+    sign = np.ones(batch, dtype=np.int64)
+    singular = np.zeros(batch, dtype=bool)
+    prev = np.ones(batch, dtype=dtype)
+    for p in range(n - 1):
+        # Partial pivoting: bring the first non-zero entry of column p up.
+        nonzero = m[:, p:, p] != 0
+        swap = p + np.argmax(nonzero, axis=1)
+        singular |= ~nonzero.any(axis=1)
+        moved = swap != p
+        if moved.any():
+            m[rows[moved], p], m[rows[moved], swap[moved]] = (
+                m[rows[moved], swap[moved]].copy(),
+                m[rows[moved], p].copy(),
+            )
+            sign[moved] = -sign[moved]
+        pivot = m[:, p, p].copy()
+        # Keep singular matrices dividing by a non-zero pivot; their
+        # determinant is already known to be zero.
+        pivot[singular] = 1
+        m[:, p + 1 :, p + 1 :] = (
+            m[:, p + 1 :, p + 1 :] * pivot[:, None, None]
+            - m[:, p + 1 :, p : p + 1] * m[:, p : p + 1, p + 1 :]
+        ) // prev[:, None, None]
+        prev = pivot
+    dets = sign * m[:, n - 1, n - 1]
+    dets[singular] = 0
+    return dets
 
 
 def _hankel_det(seq: list[int], k: int) -> int:
@@ -31,16 +113,209 @@ def _hankel_det(seq: list[int], k: int) -> int:
     return _det(matrix)
 
 
+def _hankel_dets(seqs: np.ndarray, offsets: np.ndarray, k: int) -> np.ndarray:
+    """Batched `_hankel_det` over the windows `seqs[r, offsets[r]:]`."""
+    cols = offsets[:, None, None] + np.arange(k)[:, None] + np.arange(k)
+    return _batched_det(seqs[np.arange(len(seqs))[:, None, None], cols])
+
+
+def _hankel_nonsingular(seqs: np.ndarray, offsets: np.ndarray, k: int) -> np.ndarray:
+    """Batched `_hankel_det(...) != 0` over the windows `seqs[r, offsets[r]:]`.
+
+    A float64 LU determinant is screened against the Hadamard bound: its
+    rounding error for k <= 5 is many orders of magnitude below 1e-8 of the
+    bound, so anything above that is certainly non-zero. Only the rows that
+    fall below it are settled with exact Bareiss.
+    """
+    cols = offsets[:, None, None] + np.arange(k)[:, None] + np.arange(k)
+    matrices = seqs[np.arange(len(seqs))[:, None, None], cols]
+    floats = matrices.astype(np.float64)
+    hadamard = np.prod(np.linalg.norm(floats, axis=2), axis=1)
+    nonsingular = np.abs(np.linalg.det(floats)) > 1e-8 * hadamard
+    unsure = np.flatnonzero(~nonsingular)
+    if unsure.size:
+        nonsingular[unsure] = _batched_det(matrices[unsure]) != 0
+    return nonsingular
+
+
+
+def solve_recurrence(terms: list[int]) -> list[Fraction]:
+    """Minimal linear recurrence of `terms`, by Berlekamp-Massey over the rationals.
+
+    Returns coefficients c, in the generator's order, such that
+    terms[n] == sum(c[i] * terms[n - 1 - i]) for every n >= len(c). The
+    recurrence is the unique one of its order when len(c) <= len(terms) // 2,
+    which holds for every generated example, whose window shows 2 * max_k + 1
+    terms of a recurrence of order k <= max_k.
+    """
+    # Connection polynomials: current, and the one before the last length change.
+    conn, prev = [Fraction(1)], [Fraction(1)]
+    order, gap, prev_disc = 0, 1, Fraction(1)
+    for n, term in enumerate(terms):
+        disc = term + sum(conn[i] * terms[n - i] for i in range(1, order + 1))
+        if disc == 0:
+            gap += 1
+            continue
+        scale = disc / prev_disc
+        update = conn + [Fraction(0)] * max(0, len(prev) + gap - len(conn))
+        for i, c in enumerate(prev):
+            update[i + gap] -= scale * c
+        if 2 * order <= n:
+            prev, prev_disc = conn, disc
+            order, gap = n + 1 - order, 1
+        else:
+            gap += 1
+        conn = update
+    conn += [Fraction(0)] * (order + 1 - len(conn))
+    return [-c for c in conn[1 : order + 1]]
+
+
+def _jump_digits(coeffs: list[int], window: list[int], offset: int) -> float:
+    """Estimated decimal digits of `_jump_term(coeffs, window, offset)`, for offset >= 0.
+
+    The term grows like the dominant root of the characteristic polynomial,
+    so the estimate is log10 of the window's largest magnitude plus `offset`
+    times log10 of that root's modulus. It is within a few digits of the
+    exact count, except where the dominant roots are complex and their
+    contributions cancel at this offset, leaving a far smaller term.
+    """
+    radius = np.abs(np.roots([1, *(-c for c in coeffs)])).max()
+    return math.log10(max(abs(t) for t in window)) + offset * math.log10(radius)
+
+
+def _jump_term(coeffs: list[int], window: list[int], offset: int) -> int:
+    """Term `offset` positions after window[0], exactly, for any integer offset.
+
+    `window` holds k consecutive terms, oldest first. Kitamasa's method:
+    x^offset reduced modulo the characteristic polynomial has coefficients r
+    with term = sum(r[j] * window[j]), found by repeated squaring in
+    O(k^2 log |offset|) big-integer operations. Going backward the base is
+    x^-1 = (x^(k-1) - c1 x^(k-2) - ... - c(k-1)) / ck, so the powers are
+    carried as integers over ck^|offset| and divided out at the end.
+    """
+    k = len(coeffs)
+
+    def reduce(poly: list[int]) -> list[int]:
+        poly = poly + [0] * (k - len(poly))
+        # x^d = sum_i c[i] x^(d - 1 - i) for d >= k
+        for d in range(len(poly) - 1, k - 1, -1):
+            top = poly[d]
+            if top:
+                for i, c in enumerate(coeffs):
+                    poly[d - 1 - i] += top * c
+        return poly[:k]
+
+    def mulmod(a: list[int], b: list[int]) -> list[int]:
+        prod = [0] * (2 * k - 1)
+        for i, x in enumerate(a):
+            if x:
+                for j, y in enumerate(b):
+                    prod[i + j] += x * y
+        return reduce(prod)
+
+    if offset >= 0:
+        base, scale = reduce([0, 1]), 1
+    else:
+        base, scale = [-c for c in coeffs[k - 2 :: -1]] + [1] if k > 1 else [1], coeffs[-1]
+    power, result = abs(offset), reduce([1])
+    while power:
+        if power & 1:
+            result = mulmod(result, base)
+        base = mulmod(base, base)
+        power >>= 1
+    term, rest = divmod(sum(r * t for r, t in zip(result, window)), scale ** abs(offset))
+    if rest:
+        raise ValueError(f"Term {offset} of the recurrence {coeffs} from {window} is not an integer")
+    return term
+
+# Verdicts of _has_unit_roots keyed by coefficient tuple. With |c| <= 5 and
+# k <= 5 there are only ~10^5 possible keys, and a dataset revisits the same
+# recurrences many times, so each one is only ever solved once.
+_UNIT_ROOT_VERDICTS: dict[tuple[int, ...], bool] = {}
+
+
+def _companion_unit_roots(coeffs: np.ndarray) -> np.ndarray:
+    """Batched unit-circle root check for an (n, k) array of coefficients.
+
+    Builds the same companion matrix `np.roots` would for each characteristic
+    polynomial and solves all n eigenvalue problems in one call.
+    """
+    n, k = coeffs.shape
+    companion = np.zeros((n, k, k))
+    companion[:, 0, :] = coeffs
+    companion[:, np.arange(1, k), np.arange(k - 1)] = 1.0
+    roots = np.linalg.eigvals(companion)
+    return (np.abs(np.abs(roots) - 1) < 1e-6).any(axis=1)
+
+
 def _has_unit_roots(coeffs: list[int]) -> bool:
     """Check if the characteristic polynomial has any roots with |root| = 1.
 
     For integer coefficients, roots on the unit circle are roots of unity
     (Kronecker's theorem), so the sequence is periodic.
     """
-    char_poly = [1] + [-c for c in coeffs]
-    roots = np.roots(char_poly)
-    return any(abs(abs(r) - 1) < 1e-6 for r in roots)
+    key = tuple(coeffs)
+    verdict = _UNIT_ROOT_VERDICTS.get(key)
+    if verdict is None:
+        char_poly = [1] + [-c for c in coeffs]
+        roots = np.roots(char_poly)
+        verdict = any(abs(abs(r) - 1) < 1e-6 for r in roots)
+        _UNIT_ROOT_VERDICTS[key] = verdict
+    return verdict
+
+
+def _unit_root_mask(coeffs: np.ndarray, ks: np.ndarray) -> np.ndarray:
+    """Batched `_has_unit_roots` over zero-padded (n, max_k) coefficient rows.
+
+    Verdicts come from the shared table; rows whose coefficients have not
+    been seen yet are solved together with `_companion_unit_roots`.
+    """
+    keys = [tuple(row[:k]) for row, k in zip(coeffs.tolist(), ks.tolist())]
+    missing = {key for key in keys if key not in _UNIT_ROOT_VERDICTS}
+    for k in {len(key) for key in missing}:
+        batch = [key for key in missing if len(key) == k]
+        verdicts = _companion_unit_roots(np.array(batch, dtype=np.float64))
+        _UNIT_ROOT_VERDICTS.update(zip(batch, verdicts.tolist()))
+    return np.array([_UNIT_ROOT_VERDICTS[key] for key in keys], dtype=bool)
+
 
+# Biased coefficient sampling: positives 3x more likely, zero excluded
+_COEFF_POOL = [1, 2, 3, 4, 5] + [-1, -2, -3, -4, -5]
+_INIT_RANGE = range(-4, 5)  # -4 to 4 inclusive
+_MAX_ABS_VALUE = 100_000
+_MAX_LOOKAHEAD = 10
+# Answers have fewer digits than this, so that they stay below Python's
+# default limit on int <-> str conversions (4300 digits).
+_MAX_ANSWER_DIGITS = 4000
+_ANSWER_LIMIT = 10**_MAX_ANSWER_DIGITS
+# Far targets whose `_jump_digits` estimate exceeds the limit by this much
+# are rejected without computing them.
+_JUMP_DIGITS_MARGIN = 20
+
+# Share of the example space set aside for the "eval" split (see _key_split).
+_EVAL_FRACTION = 1 / 8
+_SPLITS = ("train", "eval")
+
+# On-disk layout written by build_index.py: meta.json plus one memory-mapped
+# .npy file per (order, array) pair. Bump the version when either changes.
+_INDEX_VERSION = 1
+_INDEX_ARRAYS = ("coeffs", "weights", "dense", "offsets", "inits", "starts")
+
+# Raw rng words decoded per buffer in _generate_dataset. Roughly 1 in 50
+# candidates survives the filters and a candidate consumes ~15 words, so one
+# buffer covers a couple dozen examples.
+_WORD_BUFFER_SIZE = 1 << 14
+
+# Candidates drawn per batch when sampling from an index.
+_INDEX_BATCH_SIZE = 1 << 10
+
+# Datasets are cached under a hash of their arguments, the sampling constants,
+# this version and the module source. Bump the version when a change to the
+# generator alters its output without touching this file.
+_GENERATOR_VERSION = 1
+_CACHE_DIR = Path(
+    os.environ.get("NUM_SEQ_ENV_CACHE_DIR", Path.home() / ".cache" / "num_seq_env")
+)
 
 
 SYSTEM_PROMPT = (
@@ -56,101 +331,1711 @@ SYSTEM_PROMPT = (
     "The <answer> tag must contain only the integer value, nothing else."
 )
 
+def _unroll(
+    coeffs: np.ndarray,
+    inits: np.ndarray,
+    ks: np.ndarray,
+    lengths: np.ndarray,
+    max_abs_value: int | None,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """Unroll a batch of recurrences column-wise; see `_simulate_batch`.
+
+    Returns, per row, how many leading terms stay within `max_abs_value`
+    (all of them if it is None), capped at `lengths[i]`. If `out` is given,
+    a (max(lengths), n) array, the terms are written into it. The arithmetic
+    runs in the dtype of `inits`: int64, or object for Python ints.
+    """
+    n, max_k = coeffs.shape
+    bounded = lengths.copy()
+    if out is not None:
+        out[:max_k] = inits.T
+
+    # Ring buffer of the last max_k terms: term t lives in slot t % max_k.
+    window = np.array(inits.T, order="C")
+    coeffs_t = np.ascontiguousarray(coeffs.T)
+    rows = np.arange(n)
+    live = np.ones(n, dtype=bool)
+    live_ks, live_lengths = ks, lengths
+    live_inits = inits.T
+    term = np.empty(n, dtype=window.dtype)
+
+    for pos in range(int(ks.min()), int(lengths.max())):
+        next_val = coeffs_t[0] * window[(pos - 1) % max_k]
+        for i in range(1, max_k):
+            np.multiply(coeffs_t[i], window[(pos - 1 - i) % max_k], out=term)
+            next_val += term
+        if pos < max_k:
+            # Rows with k > pos are still inside their initial values.
+            next_val = np.where(live_ks <= pos, next_val, live_inits[pos])
+
+        if max_abs_value is None:
+            too_big = np.zeros(next_val.shape, dtype=bool)
+        else:
+            too_big = np.abs(next_val) > max_abs_value
+        in_range = live_lengths > pos
+        rejected = too_big & in_range & live
+        if rejected.any():
+            bounded[rows[rejected]] = pos
+        live &= in_range & ~too_big
+        next_val *= live
+        window[pos % max_k] = next_val
+        if out is not None:
+            out[pos, rows] = next_val
+
+        alive = int(live.sum())
+        if not alive:
+            break
+        if 2 * alive < live.size:
+            keep = np.flatnonzero(live)
+            rows, live = rows[keep], live[keep]
+            window, coeffs_t = window[:, keep], coeffs_t[:, keep]
+            live_ks, live_lengths = live_ks[keep], live_lengths[keep]
+            live_inits = live_inits[:, keep]
+            term = term[: keep.size]
+    return bounded
+
+
+def _int64_limit(coeffs: np.ndarray) -> int:
+    """Largest term magnitude whose next recurrence term cannot overflow int64.
+
+    A term is a sum of at most max_k products c * t, so it stays below 2^63
+    while every |t| is within (2^63 - 1) // (max_k * max |c|).
+    """
+    n, max_k = coeffs.shape
+    peak = int(np.abs(coeffs).max()) if n else 1
+    return (2**63 - 1) // (max_k * max(peak, 1))
+
+
+def _simulate_batch(
+    coeffs: np.ndarray,
+    inits: np.ndarray,
+    ks: np.ndarray,
+    lengths: np.ndarray,
+    max_abs_value: int | None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Run the recurrences for a batch of candidates as int64 array ops.
+
+    `coeffs` and `inits` are (n, max_k) arrays zero-padded past each row's
+    order `ks[i]`. Row i is unrolled to `lengths[i]` terms and is rejected as
+    soon as one of its recurrence terms exceeds `max_abs_value`. Rejected and
+    finished rows are zeroed so the batch never overflows int64, and are
+    compacted out of the working set once they make up half of it. Most
+    candidates overflow within a few terms, so the full sequences are only
+    materialized in a second pass over the survivors.
+
+    A `max_abs_value` of None (no bound) or beyond `_int64_limit` cannot be
+    checked in int64. The batch is then unrolled in int64 up to that limit
+    first, which settles every row that stays inside it, and only rows that
+    outgrow it are unrolled again with Python ints. The term array is then an
+    object array if any of those survive.
+
+    Returns the (n, max(lengths)) term array and the mask of surviving rows.
+    """
+    limit = _int64_limit(coeffs)
+    if max_abs_value is not None and max_abs_value <= limit:
+        wide = np.zeros(len(ks), dtype=bool)
+        ok = _unroll(coeffs, inits, ks, lengths, max_abs_value) == lengths
+    else:
+        wide = _unroll(coeffs, inits, ks, lengths, limit) < lengths
+        ok = ~wide
+        rows = np.flatnonzero(wide)
+        if rows.size:
+            ok[rows] = _unroll(
+                coeffs[rows].astype(object), inits[rows].astype(object), ks[rows],
+                lengths[rows], max_abs_value,
+            ) == lengths[rows]
+
+    dtype = object if (ok & wide).any() else np.int64
+    seqs = np.zeros((int(lengths.max()), len(ks)), dtype=dtype)
+    for rows, row_dtype in ((ok & ~wide, np.int64), (ok & wide, object)):
+        survivors = np.flatnonzero(rows)
+        if not survivors.size:
+            continue
+        terms = np.zeros((int(lengths[survivors].max()), survivors.size), dtype=row_dtype)
+        _unroll(
+            coeffs[survivors].astype(row_dtype), inits[survivors].astype(row_dtype),
+            ks[survivors], lengths[survivors], max_abs_value, out=terms,
+        )
+        seqs[: len(terms), survivors] = terms
+    return seqs.T, ok
+
+
+def _draw_words(rng: random.Random, n: int) -> np.ndarray:
+    """Pull the next `n` raw 32-bit Mersenne Twister outputs from `rng`."""
+    raw = rng.getrandbits(32 * n).to_bytes(4 * n, "little")
+    return np.frombuffer(raw, dtype="<u4").astype(np.int64)
+
+
+def _randbelow_table(words: np.ndarray, n: int) -> tuple[np.ndarray, np.ndarray]:
+    """Replay `Random._randbelow(n)` from every offset of a word stream.
+
+    `Random.choice` and `Random.randint` draw `getrandbits(n.bit_length())`
+    until the value is below n; each such call consumes exactly one 32-bit
+    word and keeps its top bits. Returns `(values, hit)`, both one longer
+    than `words`: a draw starting at offset p accepts the word at `hit[p]`
+    and returns `values[hit[p]]`. `hit[p] == len(words)` means the buffer ran
+    out before the draw was accepted.
+    """
+    size = len(words)
+    values = np.append(words >> (32 - n.bit_length()), 0)
+    offsets = np.where(values[:size] < n, np.arange(size), size)
+    hit = np.append(np.minimum.accumulate(offsets[::-1])[::-1], size)
+    return values, hit
+
+
+def _decode_candidates(
+    words: np.ndarray,
+    min_k: int,
+    max_k: int,
+    coeff_pool: list[int],
+    init_range: range,
+    max_start_idx: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Decode the candidate drawn from every offset of a word stream.
+
+    A candidate is drawn as `k = rng.randint(min_k, max_k)`, then k
+    `rng.choice(coeff_pool)`, k `rng.choice(init_range)` and
+    `start_idx = rng.randint(1, max_start_idx)`. Row p of the returned
+    `(ks, coeffs, inits, start_idx, ends)` is the candidate those calls
+    would produce if the rng were positioned at word p; `coeffs` and `inits`
+    are zero-padded to max_k columns and `ends[p]` is the offset just past
+    its last draw, or `len(words) + 1` if the buffer cut it off.
+    """
+    size = len(words)
+    k_vals, k_hit = _randbelow_table(words, max_k - min_k + 1)
+    c_vals, c_hit = _randbelow_table(words, len(coeff_pool))
+    i_vals, i_hit = _randbelow_table(words, len(init_range))
+    s_vals, s_hit = _randbelow_table(words, max_start_idx)
+    pool = np.array(coeff_pool, dtype=np.int64)
+    init_values = np.array(init_range, dtype=np.int64)
+
+    hit = k_hit[:size]
+    cut = hit == size
+    ks = min_k + k_vals[hit]
+    pos = np.minimum(hit + 1, size)
+
+    coeffs = np.zeros((size, max_k), dtype=np.int64)
+    inits = np.zeros((size, max_k), dtype=np.int64)
+    for out, vals, table, hits in (
+        (coeffs, c_vals, pool, c_hit),
+        (inits, i_vals, init_values, i_hit),
+    ):
+        for j in range(max_k):
+            use = j < ks
+            hit = hits[pos]
+            cut |= use & (hit == size)
+            out[:, j] = np.where(use, table[vals[hit] % len(table)], 0)
+            pos = np.where(use, np.minimum(hit + 1, size), pos)
+
+    hit = s_hit[pos]
+    cut |= hit == size
+    start_idx = 1 + s_vals[hit]
+    ends = np.where(cut, size + 1, hit + 1)
+    return ks, coeffs, inits, start_idx, ends
+
+
+def _load_recurrence_index(
+    index_dir: str | Path,
+) -> tuple[dict, dict[int, dict[str, np.ndarray]]]:
+    """Open a valid-recurrence index written by build_index.py.
+
+    Returns the index metadata and, per order k, its arrays memory-mapped
+    read-only:
+
+    - `coeffs` (n, k) int8: every non-periodic coefficient vector that
+      admits at least one (inits, start_idx) pair.
+    - `weights` (n,): number of admissible (inits, start_idx) pairs.
+    - `dense` (n,) bool: at least `dense_fraction` of all pairs admissible.
+    - `offsets` (n + 1,): for sparse entries, the slice of `inits`/`starts`
+      listing their region; empty for dense entries.
+    - `inits` uint16: base-len(init_range) index of an admissible inits tuple.
+    - `starts` uint8: how many start_idx values (1..starts) that inits admits.
+    """
+    path = Path(index_dir)
+    meta = json.loads((path / "meta.json").read_text())
+    if meta["version"] != _INDEX_VERSION:
+        raise ValueError(
+            f"Index at {path} has version {meta['version']}, expected {_INDEX_VERSION}; "
+            "rebuild it with build_index.py"
+        )
+    tables = {
+        k: {
+            name: np.load(path / f"k{k}_{name}.npy", mmap_mode="r")
+            for name in _INDEX_ARRAYS
+        }
+        for k in meta["orders"]
+    }
+    return meta, tables
+
+
+def _decode_inits(index: np.ndarray, k: int) -> np.ndarray:
+    """Map base-len(_INIT_RANGE) indices back to (n, k) init tuples."""
+    base = len(_INIT_RANGE)
+    digits = index[:, None] // base ** np.arange(k - 1, -1, -1) % base
+    return np.asarray(_INIT_RANGE)[digits]
+
+
+def _sample_regions(
+    table: dict[str, np.ndarray],
+    rows: np.ndarray,
+    k: int,
+    rng: np.random.Generator,
+    max_start_idx: int,
+    span: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Draw (inits, start_idx) uniformly from the regions of index `rows`.
+
+    Sparse entries pick a listed inits tuple and keep a uniform start_idx if
+    that tuple admits it. Dense entries draw inits and start_idx uniformly
+    and keep them if the recurrence stays bounded for `start_idx + span`
+    terms with a non-singular Hankel matrix. Both are exact rejection
+    samplers, so every admissible pair of an entry is equally likely.
+    """
+    n = len(rows)
+    inits = np.zeros((n, k), dtype=np.int64)
+    starts = np.zeros(n, dtype=np.int64)
+    coeffs = np.asarray(table["coeffs"][rows], dtype=np.int64)
+    dense = np.asarray(table["dense"][rows])
+    lo = np.asarray(table["offsets"][rows])
+    size = np.asarray(table["offsets"][rows + 1]) - lo
+
+    pending = np.flatnonzero(~dense)
+    while pending.size:
+        pick = lo[pending] + (rng.random(pending.size) * size[pending]).astype(np.int64)
+        start = rng.integers(1, max_start_idx + 1, pending.size)
+        hit = start <= table["starts"][pick]
+        done = pending[hit]
+        inits[done] = _decode_inits(np.asarray(table["inits"][pick[hit]], dtype=np.int64), k)
+        starts[done] = start[hit]
+        pending = pending[~hit]
+
+    pending = np.flatnonzero(dense)
+    while pending.size:
+        draw = rng.integers(0, len(_INIT_RANGE) ** k, pending.size)
+        cand = _decode_inits(draw, k)
+        start = rng.integers(1, max_start_idx + 1, pending.size)
+        lengths = start + span
+        ks = np.full(pending.size, k)
+        hit = _unroll(coeffs[pending], cand, ks, lengths, _MAX_ABS_VALUE) == lengths
+        if hit.any():
+            head = np.zeros((pending.size, 2 * k - 1), dtype=np.int64)
+            idx = np.flatnonzero(hit)
+            seqs, _ = _simulate_batch(
+                coeffs[pending[idx]], cand[idx], ks[idx],
+                np.full(idx.size, 2 * k - 1), _MAX_ABS_VALUE,
+            )
+            head[idx] = seqs
+            hit[idx] = _hankel_nonsingular(head[idx], np.zeros(idx.size, dtype=np.int64), k)
+        done = pending[hit]
+        inits[done] = cand[hit]
+        starts[done] = start[hit]
+        pending = pending[~hit]
+    return inits, starts
+
+
+class GenerationStats:
+    """Where dataset generation spends its time and why candidates are rejected.
+
+    `counts[k][outcome]` tallies sampled candidates of order k by outcome:
+    "accepted", or rejected for "overflow" (a term beyond `max_abs_value`, or
+    an answer of `_MAX_ANSWER_DIGITS` digits or more, exact or estimated),
+    "singular" (zero Hankel determinant, so not genuinely order k),
+    "unit_root" (periodic), "duplicate" (key already drawn) or
+    "other_split" (key belongs to the split not being drawn). `seconds`
+    accumulates wall time per generation stage. Pass one to
+    `_generate_dataset` to fill it; stats from worker processes are merged in.
+    """
+
+    OUTCOMES = ("accepted", "overflow", "singular", "unit_root", "duplicate", "other_split")
+
+    def __init__(self):
+        self.counts: dict[int, dict[str, int]] = {}
+        self.seconds: dict[str, float] = {}
+
+    def count(self, k: int, outcome: str, n: int = 1) -> None:
+        by_outcome = self.counts.setdefault(k, dict.fromkeys(self.OUTCOMES, 0))
+        by_outcome[outcome] += n
+
+    @contextlib.contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + time.perf_counter() - start
+
+    def merge(self, other: "GenerationStats") -> None:
+        for k, by_outcome in other.counts.items():
+            for outcome, n in by_outcome.items():
+                self.count(k, outcome, n)
+        for stage, seconds in other.seconds.items():
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def summary(self) -> str:
+        """Acceptance rate and outcome shares per k, then time per stage."""
+        lines = [f"{'k':>3} {'candidates':>11} {'accepted':>9} " + " ".join(f"{o:>9}" for o in self.OUTCOMES[1:])]
+        for k in sorted(self.counts):
+            by_outcome = self.counts[k]
+            total = sum(by_outcome.values())
+            shares = " ".join(f"{by_outcome[o] / total:>9.2%}" for o in self.OUTCOMES[1:])
+            lines.append(f"{k:>3} {total:>11} {by_outcome['accepted'] / total:>9.2%} {shares}")
+        total_seconds = sum(self.seconds.values())
+        for stage, seconds in sorted(self.seconds.items(), key=lambda item: -item[1]):
+            lines.append(f"{stage:>15}: {seconds:8.3f}s ({seconds / total_seconds:.0%})")
+        return "\n".join(lines)
+
+
+def _stage_timer(stats: GenerationStats | None, stage: str) -> contextlib.AbstractContextManager:
+    """`stats.timer(stage)`, or a no-op without stats."""
+    return stats.timer(stage) if stats is not None else contextlib.nullcontext()
+
+
+def _key_digest(key: tuple) -> int:
+    """Stable 192-bit digest of an example key (coeffs, inits, start_idx, target_pos)."""
+    return int.from_bytes(hashlib.blake2b(repr(key).encode(), digest_size=24).digest(), "little")
+
+
+def _key_split(key: tuple) -> str:
+    """The split ("train" or "eval") an example key belongs to.
+
+    The top 64 bits of the key's digest partition the whole example space,
+    a fixed `_EVAL_FRACTION` of it to "eval", so splits drawn with any
+    seeds, shard counts or generation settings never share an example.
+    """
+    return "eval" if (_key_digest(key) >> 128) < _EVAL_FRACTION * 2**64 else "train"
+
+
+class _SeenFilter:
+    """Set of example keys in a few bytes per key: a scalable Bloom filter.
+
+    A key that was added is always found, so a stream deduplicated through
+    it never repeats an example; a fresh key is wrongly found with
+    probability below `error_rate`, which only skips it. Each stage is sized
+    for its capacity, and once it fills, a new stage twice as large with
+    half the error rate takes new keys, so the overall rate stays around
+    2 * `error_rate` however many keys arrive. At the default rate a key
+    costs 4-7 bytes, against ~250 for a set of tuples.
+    """
+
+    def __init__(self, capacity: int = 1 << 14, error_rate: float = 2**-20):
+        self._capacity = capacity
+        self._error_rate = error_rate
+        # (bits, num_bits, num_hashes) per stage; keys go to the last one.
+        self._stages: list[tuple[bytearray, int, int]] = []
+        self._free = 0
+        self._add_stage()
+
+    def _add_stage(self) -> None:
+        level = len(self._stages)
+        capacity = self._capacity << level
+        num_hashes = math.ceil(-math.log2(self._error_rate / 2**level))
+        num_bits = math.ceil(capacity * num_hashes / math.log(2))
+        self._stages.append((bytearray(-(-num_bits // 8)), num_bits, num_hashes))
+        self._free = capacity
+
+    @staticmethod
+    def _hashes(key: tuple) -> tuple[int, int]:
+        # Double hashing, h1 + i * h2, over the low 128 bits of the digest.
+        digest = _key_digest(key)
+        return digest & (2**64 - 1), (digest >> 64) & (2**64 - 1) | 1
+
+    def add(self, key: tuple) -> bool:
+        """Record `key`; returns False if it was (probably) recorded before."""
+        h1, h2 = self._hashes(key)
+        for bits, num_bits, num_hashes in self._stages:
+            for i in range(num_hashes):
+                pos = (h1 + i * h2) % num_bits
+                if not bits[pos >> 3] >> (pos & 7) & 1:
+                    break
+            else:
+                return False
+        if self._free == 0:
+            self._add_stage()
+        bits, num_bits, num_hashes = self._stages[-1]
+        for i in range(num_hashes):
+            pos = (h1 + i * h2) % num_bits
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self._free -= 1
+        return True
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(bits) for bits, _, _ in self._stages)
+
+
+def _iter_index_examples(
+    seed: int,
+    max_start_idx: int,
+    min_k: int,
+    max_k: int,
+    index_dir: str | Path,
+    max_lookahead: int = _MAX_LOOKAHEAD,
+    split: str | None = None,
+    stats: GenerationStats | None = None,
+) -> Iterator[tuple[tuple, dict]]:
+    """Endlessly draw distinct examples straight from a valid-recurrence index.
+
+    Picks index entries in proportion to their admissible mass, then an
+    (inits, start_idx) pair uniformly from the entry's region. This is the
+    distribution the rejection loop in `_generate_dataset` converges to (k
+    uniform and every (coeffs, inits, start_idx) tuple of that order equally
+    likely before filtering), but without drawing rejected candidates. The
+    random stream differs, so a seed does not reproduce the rejection
+    sampler's examples. Only duplicates and, with `split`, keys of the other
+    split are ever rejected, so `stats` sees just those outcomes and
+    "accepted".
+    """
+    meta, tables = _load_recurrence_index(index_dir)
+    expected = {
+        "max_k": max_k,
+        "max_start_idx": max_start_idx,
+        "coeff_pool": _COEFF_POOL,
+        "init_range": [_INIT_RANGE.start, _INIT_RANGE.stop],
+        "max_abs_value": _MAX_ABS_VALUE,
+        "max_lookahead": max_lookahead,
+    }
+    stale = [name for name, value in expected.items() if meta[name] != value]
+    missing = [k for k in range(min_k, max_k + 1) if k not in tables]
+    if stale or missing:
+        raise ValueError(
+            f"Index at {index_dir} does not match this configuration "
+            f"(mismatched: {stale}, missing orders: {missing}); rebuild it with build_index.py"
+        )
+
+    max_num_shown = 2 * max_k + 1
+    span = max_num_shown + max_lookahead - 1
+    orders = np.concatenate(
+        [np.full(len(tables[k]["weights"]), k) for k in range(min_k, max_k + 1)]
+    )
+    entries = np.concatenate(
+        [np.arange(len(tables[k]["weights"])) for k in range(min_k, max_k + 1)]
+    )
+    # Prior mass of one (coeffs, inits) tuple of order k; the uniform k and
+    # start_idx factors are shared by all entries and cancel.
+    mass = np.concatenate(
+        [
+            tables[k]["weights"] / float(len(_COEFF_POOL) * len(_INIT_RANGE)) ** k
+            for k in range(min_k, max_k + 1)
+        ]
+    )
+    cumulative = np.cumsum(mass)
+
+    rng = np.random.default_rng(seed)
+    seen = _SeenFilter()
+    n = _INDEX_BATCH_SIZE
+    while True:
+        with _stage_timer(stats, "sample"):
+            picks = np.searchsorted(cumulative, rng.random(n) * cumulative[-1], side="right")
+            ks = orders[picks]
+            coeffs = np.zeros((n, max_k), dtype=np.int64)
+            inits = np.zeros((n, max_k), dtype=np.int64)
+            starts = np.zeros(n, dtype=np.int64)
+            for k in np.unique(ks).tolist():
+                group = np.flatnonzero(ks == k)
+                rows = entries[picks[group]]
+                coeffs[group, :k] = tables[k]["coeffs"][rows]
+                inits[group, :k], starts[group] = _sample_regions(
+                    tables[k], rows, k, rng, max_start_idx, span
+                )
+
+        with _stage_timer(stats, "simulate"):
+            seqs, _ = _simulate_batch(coeffs, inits, ks, starts + span, _MAX_ABS_VALUE)
+
+        # Valid target positions (1-indexed): before and after the shown window
+        backward = np.minimum(starts - 1, max_lookahead)
+        choice = (rng.random(n) * (backward + max_lookahead)).astype(np.int64)
+        target_pos = np.where(
+            choice < backward,
+            starts - backward + choice,
+            starts + max_num_shown + choice - backward,
+        )
+
+        for i in range(n):
+            k = int(ks[i])
+            # Deduplicate on the full parameter tuple
+            key = (
+                tuple(coeffs[i, :k].tolist()),
+                tuple(inits[i, :k].tolist()),
+                int(starts[i]),
+                int(target_pos[i]),
+            )
+            if split is not None and _key_split(key) != split:
+                if stats is not None:
+                    stats.count(k, "other_split")
+                continue
+            if not seen.add(key):
+                if stats is not None:
+                    stats.count(k, "duplicate")
+                continue
+            with _stage_timer(stats, "format"):
+                example = _format_example(
+                    seqs[i].tolist(),
+                    list(key[0]),
+                    int(starts[i]),
+                    max_num_shown,
+                    int(target_pos[i]),
+                    int(seqs[i, target_pos[i] - 1]),
+                )
+            if stats is not None:
+                stats.count(k, "accepted")
+            yield key, example
+
+
+def _format_example(
+    seq: list[int],
+    coeffs: list[int],
+    first_shown: int,
+    num_shown: int,
+    target_pos: int,
+    answer: int,
+) -> dict:
+    """Compact record of one problem: its shown terms, window and target.
+
+    The prompt text is not built here; `_render_example` and
+    `render_prompts` derive it from `terms`, `first_shown` and
+    `target_pos`. `info` records the recurrence and the problem's position,
+    so results can be sliced by difficulty without re-deriving them.
+    """
+    last_shown = first_shown + num_shown - 1
+    shown = seq[first_shown - 1 : last_shown]
+    forward = target_pos > last_shown
+    return {
+        "terms": shown,
+        "first_shown": first_shown,
+        "target_pos": target_pos,
+        "answer": str(answer),
+        "info": {
+            "k": len(coeffs),
+            "coeffs": coeffs,
+            "start_idx": first_shown,
+            "target_pos": target_pos,
+            "direction": "forward" if forward else "backward",
+            "steps": target_pos - last_shown if forward else first_shown - target_pos,
+            "magnitude": len(str(max(abs(t) for t in [*shown, answer]))),
+        },
+    }
+
+
+def _render_prompt(terms: list[int], first_shown: int, target_pos: int) -> list[dict]:
+    """Chat prompt asking for term `target_pos` given `terms` from `first_shown` on."""
+    last_shown = first_shown + len(terms) - 1
+    terms_str = ", ".join(map(str, terms))
+    prompt_text = (
+        f"Here are terms {first_shown} through {last_shown} of a sequence:\n"
+        f"{terms_str}\n\n"
+        f"What is term {target_pos} of the sequence?"
+    )
+    return [{"role": "user", "content": prompt_text}]
+
+
+def _render_example(example: dict) -> dict:
+    """A compact example (see `_format_example`) as a prompt/answer/info row."""
+    return {
+        "prompt": _render_prompt(example["terms"], example["first_shown"], example["target_pos"]),
+        "answer": example["answer"],
+        "info": example["info"],
+    }
+
+
+def _render_batch(batch: dict) -> dict:
+    """Prompts of a batch of compact rows, for `Dataset.map` and format transforms."""
+    return {
+        "prompt": [
+            _render_prompt(terms, first_shown, target_pos)
+            for terms, first_shown, target_pos in zip(
+                batch["terms"], batch["first_shown"], batch["target_pos"]
+            )
+        ],
+        "answer": batch["answer"],
+        "info": batch["info"],
+    }
+
+
+def _iter_examples(
+    seed: int,
+    max_start_idx: int,
+    min_k: int,
+    max_k: int,
+    max_lookahead: int = _MAX_LOOKAHEAD,
+    jump_ahead: bool = False,
+    max_abs_value: int | None = _MAX_ABS_VALUE,
+    split: str | None = None,
+    stats: GenerationStats | None = None,
+) -> Iterator[tuple[tuple, dict]]:
+    """Endlessly generate distinct linear recurrence sequence problems.
+
+    Yields each example with its (coeffs, inits, start_idx, target_pos) key.
+
+    Sampling follows a plain rejection loop over `random.Random(seed)`, but
+    instead of calling the rng once per draw, a buffer of raw words is pulled
+    at once and the candidate starting at every word offset is decoded and
+    unrolled in bulk (`_decode_candidates`, `_simulate_batch`). Walking the
+    buffer from candidate to candidate then reproduces the serial loop's
+    random stream exactly, so a given seed yields the same examples as
+    drawing each candidate with `rng.randint`/`rng.choice`.
+
+    Every term up to the last possible target must stay within
+    `max_abs_value`, or is unbounded if it is None; bounds past int64 are
+    simulated with Python ints only where terms outgrow int64 (see
+    `_simulate_batch`). With `jump_ahead`, only the terms up to the end of the
+    shown window are simulated and bounded, and forward targets are computed
+    exactly from the window by `_jump_term`, so `max_lookahead` can be large
+    at no simulation cost; those answers can be large integers, up to
+    `_MAX_ANSWER_DIGITS` digits. Longer ones are rejected, by a cheap
+    `_jump_digits` estimate where they are far longer, so only answers near
+    the limit cost an exact computation to reject.
+
+    Duplicates are dropped through a `_SeenFilter`, so memory stays at a few
+    bytes per example. With `split`, only keys of that split (see
+    `_key_split`) are kept.
+
+    With `stats`, every candidate on the walked chain is counted by outcome,
+    and the bulk stages are timed (they run over every word offset, so their
+    time includes candidates the walk skips).
+    """
+    rng = random.Random(seed)
+    coeff_pool = _COEFF_POOL
+    init_range = _INIT_RANGE
+    max_num_shown = 2 * max_k + 1  # show the same count for all k by default
+
+    seen = _SeenFilter()
+
+    buffer_state = rng.getstate()
+    buffer_size = _WORD_BUFFER_SIZE
+    words = None
+    pos = 0
+    refill = True
+
+    while True:
+        if refill:
+            if words is not None and pos == 0:
+                # A single candidate did not fit in the buffer.
+                buffer_size *= 2
+            # Advance past the consumed words and decode a fresh buffer.
+            rng.setstate(buffer_state)
+            if pos:
+                rng.getrandbits(32 * pos)
+            buffer_state = rng.getstate()
+            with _stage_timer(stats, "decode"):
+                words = _draw_words(rng, buffer_size)
+                word_list = words.tolist()
+                ks, coeffs_arr, inits_arr, starts, ends = _decode_candidates(
+                    words, min_k, max_k, coeff_pool, init_range, max_start_idx
+                )
+            # Build sequences long enough for max shown + max forward lookahead
+            lengths = starts - 1 + max_num_shown + (0 if jump_ahead else max_lookahead)
+            with _stage_timer(stats, "simulate"):
+                seqs, ok = _simulate_batch(
+                    coeffs_arr, inits_arr, ks, lengths, max_abs_value
+                )
+            # Rejection reason per candidate, indexing GenerationStats.OUTCOMES.
+            outcome = np.where(ok, 0, 1)
+            # Identifiability: k x k Hankel determinant must be non-zero
+            with _stage_timer(stats, "hankel"):
+                for k in np.unique(ks[ok]).tolist():
+                    rows = np.flatnonzero(ok & (ks == k))
+                    ok[rows] = _hankel_dets(seqs[rows], starts[rows] - 1, k) != 0
+            outcome[(outcome == 0) & ~ok] = 2
+            # Reject periodic sequences: if the characteristic polynomial has
+            # roots on the unit circle (roots of unity), the sequence is
+            # periodic and the model could exploit repeating patterns.
+            with _stage_timer(stats, "unit_roots"):
+                rows = np.flatnonzero(ok)
+                ok[rows] = ~_unit_root_mask(coeffs_arr[rows], ks[rows])
+            outcome[(outcome == 0) & ~ok] = 3
+            pos = 0
+            refill = False
+
+        if pos == buffer_size or ends[pos] > buffer_size:
+            refill = True
+            continue
+        end = int(ends[pos])
+        if not ok[pos]:
+            if stats is not None:
+                stats.count(int(ks[pos]), GenerationStats.OUTCOMES[outcome[pos]])
+            pos = end
+            continue
+
+        cand = pos
+        k = int(ks[cand])
+        start_idx = int(starts[cand])
+        seq = seqs[cand, : lengths[cand]].tolist()
+        coeffs = coeffs_arr[cand, :k].tolist()
+
+        # Valid target positions (1-indexed): before and after the shown window
+        first_shown = start_idx
+        last_shown = start_idx + max_num_shown - 1
+        num_backward = first_shown - max(1, first_shown - max_lookahead)
+        num_targets = num_backward + max_lookahead
+
+        # Same draw as rng.choice(backward + forward targets), read from the
+        # word buffer.
+        shift = 32 - num_targets.bit_length()
+        hit = end
+        while hit < buffer_size and word_list[hit] >> shift >= num_targets:
+            hit += 1
+        if hit == buffer_size:
+            refill = True
+            continue
+        choice = word_list[hit] >> shift
+        if choice < num_backward:
+            target_pos = first_shown - num_backward + choice
+        else:
+            target_pos = last_shown + 1 + choice - num_backward
+        pos = hit + 1
+
+        # Deduplicate on the full parameter tuple
+        inits = inits_arr[cand, :k].tolist()
+        key = (tuple(coeffs), tuple(inits), start_idx, target_pos)
+        if split is not None and _key_split(key) != split:
+            if stats is not None:
+                stats.count(k, "other_split")
+            continue
+        if not seen.add(key):
+            if stats is not None:
+                stats.count(k, "duplicate")
+            continue
+
+        with _stage_timer(stats, "format"):
+            if target_pos <= len(seq):
+                answer = seq[target_pos - 1]
+            elif (
+                _jump_digits(coeffs, seq[-k:], target_pos - len(seq) + k - 1)
+                < _MAX_ANSWER_DIGITS + _JUMP_DIGITS_MARGIN
+            ):
+                answer = _jump_term(coeffs, seq[-k:], target_pos - len(seq) + k - 1)
+            else:
+                # Far past the digit limit: computing it exactly would take
+                # longer than everything else about the candidate.
+                answer = None
+            # A far jump can outgrow even the answer's digit limit.
+            too_long = answer is None or abs(answer) >= _ANSWER_LIMIT
+            if not too_long:
+                example = _format_example(seq, coeffs, start_idx, max_num_shown, target_pos, answer)
+        if too_long:
+            if stats is not None:
+                stats.count(k, "overflow")
+            continue
+        if stats is not None:
+            stats.count(k, "accepted")
+        yield key, example
+
+
+def _shard_seed(seed: int, shard: int) -> int:
+    """Seed of stream `shard`; shard 0 keeps `seed` itself."""
+    if shard == 0:
+        return seed
+    digest = hashlib.sha256(f"{seed}:{shard}".encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def _iter_shard(
+    seed: int,
+    shard: int,
+    max_start_idx: int,
+    min_k: int,
+    max_k: int,
+    index_dir: str | None,
+    max_lookahead: int = _MAX_LOOKAHEAD,
+    jump_ahead: bool = False,
+    max_abs_value: int | None = _MAX_ABS_VALUE,
+    split: str | None = None,
+    stats: GenerationStats | None = None,
+) -> Iterator[tuple[tuple, dict]]:
+    """Keyed example stream of (seed, shard), from the index if one is given.
+
+    With `split` ("train" or "eval"), only examples of that split are drawn.
+    """
+    if split not in (None, *_SPLITS):
+        raise ValueError(f"split must be one of {_SPLITS} or None, got {split!r}")
+    shard_seed = _shard_seed(seed, shard)
+    if index_dir is not None:
+        if jump_ahead:
+            raise ValueError("jump_ahead cannot be combined with index_dir")
+        if max_abs_value != _MAX_ABS_VALUE:
+            raise ValueError(
+                f"index_dir needs the default max_abs_value={_MAX_ABS_VALUE}, got {max_abs_value}"
+            )
+        return _iter_index_examples(
+            shard_seed, max_start_idx, min_k, max_k, index_dir, max_lookahead, split, stats
+        )
+    return _iter_examples(
+        shard_seed, max_start_idx, min_k, max_k, max_lookahead, jump_ahead, max_abs_value,
+        split, stats,
+    )
+
+
+def _stream_examples(
+    seed: int,
+    shard: int,
+    max_start_idx: int,
+    min_k: int,
+    max_k: int,
+    index_dir: str | None,
+    max_lookahead: int = _MAX_LOOKAHEAD,
+    jump_ahead: bool = False,
+    max_abs_value: int | None = _MAX_ABS_VALUE,
+    split: str | None = None,
+    curriculum: CurriculumSampler | None = None,
+) -> Iterator[dict]:
+    """Yield the endless example stream of (seed, shard), numbered from 0.
+
+    With `curriculum`, only the examples it accepts are kept, decided as
+    they are drawn, so its latest rewards steer what comes next.
+    """
+    examples = (
+        example
+        for _, example in _iter_shard(
+            seed, shard, max_start_idx, min_k, max_k, index_dir, max_lookahead, jump_ahead,
+            max_abs_value, split,
+        )
+        if curriculum is None or curriculum.accept(example["info"])
+    )
+    for example_id, example in enumerate(examples):
+        yield {"example_id": example_id, **_render_example(example)}
+
+
+class _ShardStreams:
+    """Open example streams of `shards`, read in equal chunks.
+
+    Each shard's `_iter_shard` stream stays open between `pull`s, so a pull
+    continues where the previous one stopped. With `profile`, every shard
+    counts into its own `GenerationStats`, returned by `finish`.
+    """
+
+    def __init__(self, seed: int, shards, shard_args: tuple, profile: bool = False):
+        self.stats = [GenerationStats() if profile else None for _ in shards]
+        self.streams = [
+            _iter_shard(seed, shard, *shard_args, stats=stats)
+            for shard, stats in zip(shards, self.stats)
+        ]
+
+    def pull(self, count: int) -> list[list[tuple[tuple, dict]]]:
+        """The next `count` keyed examples of every shard."""
+        return [list(itertools.islice(stream, count)) for stream in self.streams]
+
+    def finish(self) -> list[GenerationStats | None]:
+        return self.stats
+
+    def close(self) -> None:
+        pass
+
+
+def _serve_shards(conn, seed: int, shards: list[int], shard_args: tuple, profile: bool) -> None:
+    """Worker process of `_ShardPool`: pulls `_ShardStreams` by the counts received on `conn`.
+
+    Replies with each pull, and with the stats once it receives None. An
+    exception is sent back in place of the reply.
+    """
+    try:
+        streams = _ShardStreams(seed, shards, shard_args, profile)
+        while (count := conn.recv()) is not None:
+            conn.send(streams.pull(count))
+        conn.send(streams.finish())
+    except Exception as exc:
+        conn.send(exc)
+    finally:
+        conn.close()
+
+
+class _ShardPool:
+    """`_ShardStreams` of shards 0..num_shards-1 spread over worker processes.
+
+    Shards are dealt round-robin to `num_workers` processes, which keep their
+    streams open between pulls and generate each pull in parallel.
+    """
+
+    def __init__(self, num_workers: int, seed: int, num_shards: int, shard_args: tuple, profile: bool = False):
+        context = multiprocessing.get_context()
+        self.shards = [list(range(worker, num_shards, num_workers)) for worker in range(num_workers)]
+        self.conns = []
+        self.processes = []
+        for shards in self.shards:
+            conn, worker_conn = context.Pipe()
+            process = context.Process(
+                target=_serve_shards, args=(worker_conn, seed, shards, shard_args, profile), daemon=True
+            )
+            process.start()
+            worker_conn.close()
+            self.conns.append(conn)
+            self.processes.append(process)
+
+    def _request(self, message: int | None) -> list:
+        for conn in self.conns:
+            try:
+                conn.send(message)
+            except BrokenPipeError:
+                # The worker failed and closed its end; its exception is
+                # still waiting to be received below.
+                pass
+        by_shard = {}
+        for shards, conn in zip(self.shards, self.conns):
+            reply = conn.recv()
+            if isinstance(reply, Exception):
+                raise reply
+            by_shard.update(zip(shards, reply))
+        return [by_shard[shard] for shard in sorted(by_shard)]
+
+    def pull(self, count: int) -> list[list[tuple[tuple, dict]]]:
+        """The next `count` keyed examples of every shard."""
+        return self._request(count)
+
+    def finish(self) -> list[GenerationStats | None]:
+        stats = self._request(None)
+        for process in self.processes:
+            process.join()
+        return stats
+
+    def close(self) -> None:
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        for conn in self.conns:
+            conn.close()
+
+
+def _compact_dataset(examples: list[dict]) -> Dataset:
+    """Arrow dataset of compact examples (see `_format_example`).
+
+    Every example of a dataset shows the same number of terms, so they are a
+    fixed-width list column, int32 when they fit (always, with the default
+    `max_abs_value`), else int64, else decimal strings. Window, target and
+    `info` fields are int32. Answers stay strings: with `jump_ahead` or a
+    large `max_abs_value` they can exceed int64. A row takes less than half
+    the space of its rendered form.
+    """
+    import pyarrow as pa
+    from datasets import Dataset
+    from datasets.table import InMemoryTable
+
+    num_shown = len(examples[0]["terms"]) if examples else 0
+    terms = itertools.chain.from_iterable(ex["terms"] for ex in examples)
+    try:
+        flat = np.fromiter(terms, dtype=np.int64, count=num_shown * len(examples))
+    except OverflowError:
+        values = pa.array(
+            [str(t) for ex in examples for t in ex["terms"]], pa.string()
+        )
+    else:
+        if flat.size and np.abs(flat).max() < 1 << 31:
+            flat = flat.astype(np.int32)
+        values = pa.array(flat)
+    int32 = pa.int32()
+    info_type = pa.struct(
+        [
+            ("k", int32),
+            ("coeffs", pa.list_(int32)),
+            ("start_idx", int32),
+            ("target_pos", int32),
+            ("direction", pa.string()),
+            ("steps", int32),
+            ("magnitude", int32),
+        ]
+    )
+    # Arrow has no zero-width fixed-size lists, so an empty dataset, which
+    # has no width to give, gets a plain list column instead.
+    shown = pa.FixedSizeListArray.from_arrays(values, num_shown) if examples else pa.array([], pa.list_(pa.int32()))
+    table = pa.table(
+        {
+            "terms": shown,
+            "first_shown": pa.array([ex["first_shown"] for ex in examples], int32),
+            "target_pos": pa.array([ex["target_pos"] for ex in examples], int32),
+            "answer": pa.array([ex["answer"] for ex in examples], pa.string()),
+            "info": pa.array([ex["info"] for ex in examples], info_type),
+        }
+    )
+    return Dataset(InMemoryTable(table))
+
+
+def render_prompts(dataset: Dataset, lazy: bool = False) -> Dataset:
+    """Prompt/answer/info rows of a compact dataset, the form verifiers expects.
+
+    Prompts are rendered with one batched map, which for a cached (memory-
+    mapped) dataset writes them next to it on disk. With `lazy`, they are
+    instead rendered as rows are read, through a format transform; only
+    indexing and iteration see them, so use it for sampling from large
+    pools, not as an environment's dataset.
+    """
+    if lazy:
+        return dataset.with_transform(_render_batch)
+    return dataset.map(
+        _render_batch,
+        batched=True,
+        remove_columns=["terms", "first_shown", "target_pos"],
+        desc="Rendering prompts",
+    )
+
+
 def _generate_dataset(
     num_examples: int = 500,
     seed: int = 42,
     max_start_idx: int = 24,
     min_k: int = 2,
     max_k: int = 5,
+    index_dir: str | None = None,
+    num_shards: int = 1,
+    num_workers: int = 1,
+    max_lookahead: int = _MAX_LOOKAHEAD,
+    jump_ahead: bool = False,
+    max_abs_value: int | None = _MAX_ABS_VALUE,
+    split: str | None = None,
+    stats: GenerationStats | None = None,
 ) -> Dataset:
-    """Generate a dataset of variable-order linear recurrence sequence problems."""
-    rng = random.Random(seed)
+    """Generate a dataset of variable-order linear recurrence sequence problems.
 
-    # Biased coefficient sampling: positives 3x more likely, zero excluded
-    positives = [1, 2, 3, 4, 5]
-    negatives = [-1, -2, -3, -4, -5]
-    coeff_pool = positives + negatives
+    The examples come from `num_shards` independent streams (see
+    `_iter_shard`), generated `num_workers` at a time in a process pool and
+    merged round-robin, dropping examples whose key an earlier one already
+    took. The result depends on `num_shards` but not on `num_workers`, and
+    with a single shard it is just the first `num_examples` examples of the
+    stream for `seed`. With `index_dir`, examples are drawn directly from a
+    prebuilt valid-recurrence index (see `_iter_index_examples`). Targets lie
+    up to `max_lookahead` terms outside the shown window; see `_iter_examples`
+    for `jump_ahead`, and for `max_abs_value`, the bound on term magnitudes.
+    With `split` ("train" or "eval"), every example comes
+    from that part of the example space (see `_key_split`), so datasets of
+    different splits never overlap, whatever their seeds. With `stats`,
+    outcome counts and stage timings of every shard are added to it.
 
-    init_range = range(-4, 5)  # -4 to 4 inclusive
-    max_abs_value = 100_000
-    max_lookahead = 10
-    max_num_shown = 2 * max_k + 1  # show the same count for all k by default
+    Cross-shard duplicates leave the merge short; each shard's stream is then
+    continued for just the missing rounds (see `_ShardStreams`), which
+    yields the same merge as having drawn them in the first place.
 
+    Rows are compact (see `_compact_dataset`); `render_prompts` adds the
+    prompt column verifiers needs.
+    """
+    shard_args = (
+        max_start_idx, min_k, max_k, index_dir, max_lookahead, jump_ahead, max_abs_value, split,
+    )
+    profile = stats is not None
+    num_workers = min(num_workers, num_shards)
+    if num_workers > 1:
+        streams = _ShardPool(num_workers, seed, num_shards, shard_args, profile)
+    else:
+        streams = _ShardStreams(seed, range(num_shards), shard_args, profile)
     examples: list[dict] = []
-    seen: set[tuple] = set()
+    # Each shard's stream is already distinct, so only a merge of
+    # several needs checking.
+    seen = _SeenFilter() if num_shards > 1 else None
+    with contextlib.closing(streams):
+        while len(examples) < num_examples:
+            # Enough rounds to fill the shortfall if no keys collide; merging
+            # the next chunks round-robin continues the previous merge.
+            count = -(-(num_examples - len(examples)) // num_shards)
+            for key, example in itertools.chain.from_iterable(zip(*streams.pull(count))):
+                if len(examples) == num_examples:
+                    break
+                if seen is not None and not seen.add(key):
+                    if stats is not None:
+                        # Accepted by its shard, but another shard drew it first.
+                        stats.count(len(key[0]), "accepted", -1)
+                        stats.count(len(key[0]), "duplicate")
+                    continue
+                examples.append(example)
+        shard_stats = streams.finish()
+    if stats is not None:
+        for other in shard_stats:
+            stats.merge(other)
+    with _stage_timer(stats, "build_dataset"):
+        return _compact_dataset(examples)
 
-    while len(examples) < num_examples:
-        # Sample recurrence order uniformly
-        k = rng.randint(min_k, max_k)
 
-        # Sample k coefficients; coeff_pool excludes zero so coeffs[-1] != 0
-        coeffs = [rng.choice(coeff_pool) for _ in range(k)]
+def _dataset_cache_key(**params) -> str:
+    """Content hash identifying the dataset `_generate_dataset(**params)` builds."""
+    index_dir = params.get("index_dir")
+    spec = {
+        "version": _GENERATOR_VERSION,
+        "source": hashlib.sha256(Path(__file__).read_bytes()).hexdigest(),
+        "params": params,
+        "coeff_pool": _COEFF_POOL,
+        "init_range": [_INIT_RANGE.start, _INIT_RANGE.stop],
+        "max_abs_value": _MAX_ABS_VALUE,
+        "max_lookahead": _MAX_LOOKAHEAD,
+        # The index arrays are fully determined by its metadata.
+        "index": None if index_dir is None else (Path(index_dir) / "meta.json").read_text(),
+    }
+    blob = json.dumps(spec, sort_keys=True, default=str).encode()
+    return hashlib.sha256(blob).hexdigest()[:32]
 
-        # Sample k initial values
-        inits = [rng.choice(init_range) for _ in range(k)]
 
-        start_idx = rng.randint(1, max_start_idx)
+@contextlib.contextmanager
+def _build_lock(path: Path) -> Iterator[None]:
+    """Exclusive lock on `path` across processes, where the platform has one.
 
-        # Build sequence long enough for max shown + max forward lookahead
-        offset = start_idx - 1
-        total_needed = offset + max_num_shown + max_lookahead
-        seq = list(inits)
-        overflow = False
-        for _ in range(total_needed - k):
-            next_val = sum(coeffs[i] * seq[-(i + 1)] for i in range(k))
-            if abs(next_val) > max_abs_value:
-                overflow = True
-                break
-            seq.append(next_val)
+    Without fcntl, or when the lock file cannot be created (a read-only
+    cache), concurrent builders race and the staging rename settles it.
+    """
+    try:
+        import fcntl
 
-        if overflow or len(seq) < total_needed:
-            continue
+        lock_file = open(path, "a")
+    except (ImportError, OSError):
+        yield
+        return
+    with lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
 
-        full_shown = seq[offset : offset + max_num_shown]
 
-        # Identifiability: k x k Hankel determinant must be non-zero
-        if _hankel_det(full_shown, k) == 0:
-            continue
+def _cached_dataset(
+    cache_dir: str | Path | None,
+    num_workers: int = 1,
+    rendered: bool = False,
+    **params,
+) -> Dataset:
+    """Load `_generate_dataset(**params)` from the on-disk cache, building it on a miss.
 
-        # Reject periodic sequences: if the characteristic polynomial has
-        # roots on the unit circle (roots of unity), the sequence is periodic
-        # and the model could exploit repeating patterns.
-        if _has_unit_roots(coeffs):
-            continue
+    Entries are Arrow directories written by `Dataset.save_to_disk`, so a hit
+    memory-maps the table instead of regenerating it. `num_workers` does not
+    affect the output and is left out of the key. With `rendered`, the
+    dataset is returned with its prompts rendered (`render_prompts`); they
+    are written next to the entry and memory-mapped in the same way.
 
-        num_shown = max_num_shown
-        shown = full_shown
+    Entries are built under a per-entry file lock: when many rollout workers
+    load the same environment at once, one generates and renders while the
+    others wait, then every worker maps the same pages from the page cache.
+    """
+    from datasets import Dataset
 
-        # Valid target positions (1-indexed): before and after the shown window
-        first_shown = start_idx
-        last_shown = start_idx + num_shown - 1
-        backward = list(range(max(1, first_shown - max_lookahead), first_shown))
-        forward = list(range(last_shown + 1, last_shown + max_lookahead + 1))
-        target_pos = rng.choice(backward + forward)
+    root = Path(cache_dir) if cache_dir is not None else _CACHE_DIR
+    path = root / _dataset_cache_key(**params)
+    root.mkdir(parents=True, exist_ok=True)
+    with _build_lock(root / f".{path.name}.lock"):
+        if not path.is_dir():
+            dataset = _generate_dataset(num_workers=num_workers, **params)
+            # Write next to the final location and rename, so concurrent
+            # loaders never see a partial entry.
+            staging = Path(tempfile.mkdtemp(dir=root, prefix=f".{path.name}-"))
+            try:
+                # An empty dataset would otherwise be saved as zero shards,
+                # which load_from_disk cannot read back.
+                dataset.save_to_disk(str(staging), num_shards=None if len(dataset) else 1)
+                staging.rename(path)
+            except OSError:
+                # Another process finished the same entry first.
+                if not path.is_dir():
+                    raise
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+        dataset = Dataset.load_from_disk(str(path))
+        # The rendered prompts are cached by the map's fingerprint; render
+        # under the lock as well, so that they too are only written once.
+        return render_prompts(dataset) if rendered else dataset
+
+
+def _shown_terms(prompt: list[dict]) -> list[int]:
+    """Terms shown in a rendered problem prompt."""
+    user = next(msg["content"] for msg in prompt if msg["role"] == "user")
+    return [int(t) for t in user.split("\n")[1].split(", ")]
 
-        # Deduplicate on the full parameter tuple
-        key = (tuple(coeffs), tuple(inits), start_idx, target_pos)
-        if key in seen:
-            continue
-        seen.add(key)
 
-        answer = seq[target_pos - 1]
+def verify_examples(dataset: Dataset) -> np.ndarray:
+    """Check every example against an exact solve of its shown terms.
 
-        terms_str = ", ".join(str(t) for t in shown)
-        prompt_text = (
-            f"Here are terms {first_shown} through {last_shown} of a sequence:\n"
-            f"{terms_str}\n\n"
-            f"What is term {target_pos} of the sequence?"
+    An example passes when its shown terms determine a unique minimal
+    recurrence, that recurrence is the one recorded in `info`, and running it
+    from the window, forward or backward, reaches `answer` at `target_pos`.
+    Examples are solved together per order k: the order-k Hankel systems
+    are screened with `_hankel_nonsingular` and solved in floating point,
+    and the rounded coefficients are confirmed exactly in int64 against
+    every shown term. Only rows that fail that check go through
+    `solve_recurrence`. Targets are then reached by stepping all rows
+    together in int64, except far ones or ones whose terms outgrow int64
+    (from `jump_ahead` or a large `max_abs_value`), which go through
+    `_jump_term`. Rows whose shown terms are already too large for int64
+    steps are checked one by one with Python ints.
+
+    Accepts compact datasets and rendered ones (see `render_prompts`).
+    Returns a boolean mask over the dataset's rows.
+    """
+    if not len(dataset):
+        return np.zeros(0, dtype=bool)
+    compact = "terms" in dataset.column_names
+    columns = ["terms" if compact else "prompt", "answer", "info"]
+    table = dataset.select_columns(columns).with_format("arrow")[:]
+    info = table["info"].combine_chunks()
+    ks = info.field("k").to_numpy()
+    all_coeffs = info.field("coeffs").to_pylist()
+    all_steps = info.field("steps").to_numpy()
+    all_forward = (info.field("direction").to_numpy(zero_copy_only=False) == "forward")
+    exact_answers = [int(a) for a in table["answer"].to_pylist()]
+    small = np.array([abs(a) < 1 << 62 for a in exact_answers])
+    answers = np.array([a if ok else 0 for a, ok in zip(exact_answers, small)], dtype=np.int64)
+    if compact:
+        terms_column = table["terms"].combine_chunks()
+        flat = terms_column.flatten().to_numpy(zero_copy_only=False)
+        if flat.dtype.kind != "i":
+            # Decimal strings of terms beyond int64
+            flat = np.array([int(t) for t in flat], dtype=object)
+        exact_shown = flat.reshape(len(terms_column), -1)
+    else:
+        exact_shown = np.array(
+            [_shown_terms(prompt) for prompt in table["prompt"].to_pylist()], dtype=object
         )
+    # A step of the recurrence stays within int64 while every term is below
+    # 2^62 / sum|c|; rows already past that are checked with Python ints.
+    limits = 2**62 // np.maximum([sum(map(abs, c)) for c in all_coeffs], 1)
+    wide = np.asarray(np.abs(exact_shown).max(axis=1) > limits, dtype=bool)
+    shown = np.where(wide[:, None], 0, exact_shown).astype(np.int64)
+    num_shown = shown.shape[1]
+    passed = np.zeros(len(ks), dtype=bool)
+
+    for k in np.unique(ks).tolist():
+        rows = np.flatnonzero(ks == k)
+        terms = shown[rows]
+        expected = np.array([all_coeffs[r] for r in rows], dtype=np.int64)
+        # terms[n] = sum_i c[i] * terms[n - 1 - i]; the first k equations
+        # pin c down exactly when the order-k Hankel matrix is non-singular.
+        unique = _hankel_nonsingular(terms, np.zeros(rows.size, dtype=np.int64), k)
+        lags = k - 1 + np.arange(k)[:, None] - np.arange(k)
+        coeffs = np.zeros((rows.size, k), dtype=np.int64)
+        if unique.any():
+            lhs = terms[unique][:, lags].astype(np.float64)
+            rhs = terms[unique, k : 2 * k, None].astype(np.float64)
+            try:
+                solved = np.linalg.solve(lhs, rhs)[..., 0]
+            except np.linalg.LinAlgError:
+                # Huge terms can round a non-singular system to a singular
+                # one; such rows keep zero coefficients and fall through to
+                # solve_recurrence below.
+                solved = np.zeros(rhs.shape[:2])
+                for j in range(len(lhs)):
+                    with contextlib.suppress(np.linalg.LinAlgError):
+                        solved[j] = np.linalg.solve(lhs[j], rhs[j])[:, 0]
+            solved = np.nan_to_num(solved)
+            coeffs[unique] = np.clip(np.rint(solved), -(1 << 20), 1 << 20)
+        fits = unique.copy()
+        for n in range(k, num_shown):
+            fits &= (terms[:, n - 1 :: -1][:, :k] * coeffs).sum(axis=1) == terms[:, n]
+        for i in np.flatnonzero(unique & ~fits).tolist():
+            exact = solve_recurrence(terms[i].tolist())
+            fits[i] = exact == expected[i].tolist()
+            coeffs[i] = expected[i] if fits[i] else 0
+        ok = fits & (coeffs == expected).all(axis=1)
+
+        # Run each recurrence out to its target, one step at a time.
+        steps, forward = all_steps[rows], all_forward[rows]
+        near = ok & small[rows] & (steps <= _MAX_LOOKAHEAD)
+        # Newest term first when going forward, oldest first going backward.
+        window = np.where(
+            forward[:, None], terms[:, : -k - 1 : -1], terms[:, :k]
+        ).copy()
+        divisible = np.ones(rows.size, dtype=bool)
+        escaped = np.zeros(rows.size, dtype=bool)
+        for step in range(int(steps[near].max(initial=0))):
+            active = near & (steps > step)
+            ahead = (window * coeffs).sum(axis=1)
+            # Going back: t[j] = (t[j + k] - sum_{i<k-1} c[i] t[j + k - 1 - i]) / c[k - 1].
+            rest = window[:, k - 1] - (window[:, : k - 1][:, ::-1] * coeffs[:, : k - 1]).sum(axis=1)
+            last = np.where(coeffs[:, k - 1] == 0, 1, coeffs[:, k - 1])
+            divisible &= ~(active & ~forward) | ((coeffs[:, k - 1] != 0) & (rest % last == 0))
+            behind = rest // last
+            step_terms = np.where(forward, ahead, behind)
+            # Rows past the limit may overflow from here on; they are redone exactly.
+            escaped |= active & (np.abs(step_terms) > limits[rows])
+            shifted = np.concatenate([step_terms[:, None], window[:, :-1]], axis=1)
+            window = np.where(active[:, None], shifted, window)
+        reached = near & ~escaped & divisible & (window[:, 0] == answers[rows])
+        for i in np.flatnonzero(ok & (~near | escaped)).tolist():
+            offset = num_shown - 1 + steps[i] if forward[i] else -steps[i]
+            try:
+                term = _jump_term(coeffs[i].tolist(), terms[i, :k].tolist(), int(offset))
+            except ValueError:
+                continue
+            reached[i] = term == exact_answers[rows[i]]
+        passed[rows] = reached
+
+    for r in np.flatnonzero(wide).tolist():
+        terms, k, coeffs = exact_shown[r].tolist(), int(ks[r]), all_coeffs[r]
+        if _hankel_det(terms, k) == 0 or solve_recurrence(terms) != coeffs:
+            continue
+        offset = num_shown - 1 + all_steps[r] if all_forward[r] else -all_steps[r]
+        try:
+            passed[r] = _jump_term(coeffs, terms[:k], int(offset)) == exact_answers[r]
+        except ValueError:
+            continue
+    return passed
 
-        examples.append(
-            {
-                "prompt": [{"role": "user", "content": prompt_text}],
-                "answer": str(answer),
-            }
+
+def _profiled_dataset(num_workers: int = 1, profile_lines: int = 25, **params) -> Dataset:
+    """`_generate_dataset(**params)` under cProfile, logging where the time went.
+
+    Logs the outcome counts and stage timings of `GenerationStats`, then the
+    `profile_lines` functions with the most cumulative time. The profile only
+    covers this process, so use `num_workers=1` to see inside shard
+    generation.
+    """
+    stats = GenerationStats()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        dataset = _generate_dataset(num_workers=num_workers, stats=stats, **params)
+    finally:
+        profiler.disable()
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(profile_lines)
+    logger.info(
+        "Generated %d examples in %.2fs\n%s\n%s",
+        len(dataset),
+        time.perf_counter() - start,
+        stats.summary(),
+        report.getvalue(),
+    )
+    return dataset
+
+class _StreamWindow:
+    """Fixed-size, refilling window over an endless example stream.
+
+    verifiers reads an environment's dataset through `len` and `select`:
+    `get_dataset(n)` selects the first n rows, and the RL orchestrator
+    selects each batch at a rotating offset into `get_dataset()`. A window
+    of `size` slots serves both. A slot is drawn from the stream the first
+    time it is selected after being served, so every selection returns
+    problems not served before, drawn just then: with a curriculum, they
+    follow the rewards recorded up to that moment. One iterator over the
+    stream is kept for the window's lifetime, so problems and their
+    example_ids continue across selections instead of restarting.
+
+    `filter`, `map` and `remove_columns` apply to the stream and return a
+    new window over it; `shuffle` is a no-op, as the stream is already
+    drawn at random.
+    """
+
+    def __init__(self, stream, size: int):
+        if size <= 0:
+            raise ValueError(f"window size must be positive, got {size}")
+        self.stream = stream
+        self.size = size
+        self._rows: list[dict | None] = [None] * size
+        self._iterator = None
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def column_names(self) -> list[str] | None:
+        return self.stream.column_names
+
+    def _draw(self) -> dict:
+        if self._iterator is None:
+            self._iterator = iter(self.stream)
+        return next(self._iterator)
+
+    def select(self, indices) -> Dataset:
+        """The rows at `indices`, refilling slots served by earlier selections."""
+        from datasets import Dataset
+
+        indices = list(indices)
+        for i in dict.fromkeys(indices):
+            if self._rows[i] is None:
+                self._rows[i] = self._draw()
+        rows = [self._rows[i] for i in indices]
+        for i in indices:
+            self._rows[i] = None
+        return Dataset.from_list(rows)
+
+    def to_list(self) -> list[dict]:
+        return self.select(range(self.size)).to_list()
+
+    def repeat(self, num_times: int) -> Dataset:
+        return self.select(range(self.size)).repeat(num_times)
+
+    def shuffle(self, seed: int | None = None, **kwargs) -> _StreamWindow:
+        return self
+
+    def filter(self, function, **kwargs) -> _StreamWindow:
+        return _StreamWindow(self.stream.filter(function, **kwargs), self.size)
+
+    def map(self, function, **kwargs) -> _StreamWindow:
+        return _StreamWindow(self.stream.map(function, **kwargs), self.size)
+
+    def remove_columns(self, column_names) -> _StreamWindow:
+        return _StreamWindow(self.stream.remove_columns(column_names), self.size)
+
+
+@functools.cache
+def _streaming_env_cls() -> type[vf.SingleTurnEnv]:
+    """`_StreamingSingleTurnEnv`, defined on first use to keep verifiers out of the import."""
+    import verifiers as vf
+
+    class _StreamingSingleTurnEnv(vf.SingleTurnEnv):
+        """SingleTurnEnv over an endless IterableDataset, served through a `_StreamWindow`.
+
+        The base class numbers examples with len(dataset), which a stream does
+        not have, so the stream carries its own example_id and the system prompt
+        and task column are added lazily as examples are pulled.
+        """
+
+        def __init__(self, *args, window: int, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.dataset = _StreamWindow(self.dataset, window)
+
+        def _format_dataset(self, dataset, system_prompt=None, few_shot=None, **kwargs):
+            task = self.env_id or "default"
+
+            def format_example(example: dict) -> dict:
+                if system_prompt:
+                    example["prompt"] = [
+                        {"role": "system", "content": system_prompt},
+                        *example["prompt"],
+                    ]
+                example["task"] = task
+                return example
+
+            return dataset.map(format_example)
+
+    return _StreamingSingleTurnEnv
+
+
+_ANSWER_OPEN = "<answer>"
+_ANSWER_CLOSE = "</answer>"
+_REASONING_CLOSE = "</reasoning>"
+_BOXED_OPEN = "\\boxed{"
+_INTEGER = re.compile(r"[+-]?\d+")
+_THOUSANDS = re.compile(r"[+-]?\d{1,3}(?:,\d{3})+")
+
+
+def _normalize_answer(text: str) -> str:
+    """Canonical form of an integer answer, e.g. ' +1,024. ' -> '1024'.
+
+    Anything that is not an integer after dropping math delimiters, a
+    trailing period and well-formed thousands separators is returned
+    stripped but otherwise as is, so lists like "3, 4" or "1 2" never
+    collapse into a single integer.
+    """
+    text = text.strip()
+    cleaned = text.strip("$").rstrip(".").strip().replace("\u2212", "-")
+    if _THOUSANDS.fullmatch(cleaned):
+        cleaned = cleaned.replace(",", "")
+    if _INTEGER.fullmatch(cleaned):
+        return str(int(cleaned))
+    return text
+
+
+def _last_answer_block(text: str) -> str | None:
+    """Raw content of the last complete <answer> block."""
+    close = text.rfind(_ANSWER_CLOSE)
+    if close != -1:
+        start = text.rfind(_ANSWER_OPEN, 0, close)
+        if start != -1:
+            return text[start + len(_ANSWER_OPEN) : close]
+    return None
+
+
+def _last_boxed(text: str) -> str | None:
+    """Raw content of the last \\boxed{}."""
+    start = text.rfind(_BOXED_OPEN)
+    if start == -1:
+        return None
+    # Match braces so values like \boxed{\text{42}} are taken whole.
+    pos = content = start + len(_BOXED_OPEN)
+    depth = 1
+    while depth:
+        close = text.find("}", pos)
+        if close == -1:
+            return None
+        opening = text.find("{", pos, close)
+        if opening == -1:
+            depth -= 1
+            pos = close + 1
+        else:
+            depth += 1
+            pos = opening + 1
+    return text[content : pos - 1]
+
+
+def _extract_answer_text(text: str) -> str | None:
+    """Raw content of the last <answer> block, else of the last \\boxed{}."""
+    raw = _last_answer_block(text)
+    return raw if raw is not None else _last_boxed(text)
+
+
+def extract_answer(completion: vf.Messages) -> str | None:
+    """Normalized answer of a completion, or None if it gives none.
+
+    Takes the last <answer>...</answer> across the assistant messages and
+    falls back to the last \\boxed{...}. Both are located with reverse
+    substring scans, so long reasoning traces are never regex-parsed.
+    """
+    if isinstance(completion, str):
+        text = completion
+    else:
+        text = "\n".join(
+            str(msg["content"])
+            for msg in completion
+            if msg.get("role") == "assistant" and msg.get("content") is not None
         )
+    raw = _extract_answer_text(text)
+    return None if raw is None else _normalize_answer(raw)
+
+
+def score_completions(completions: list[vf.Messages], answers: list[str]) -> list[float]:
+    """exact_match rewards for a batch of completions against their answers."""
+    return [
+        1.0 if extract_answer(completion) == _normalize_answer(answer) else 0.0
+        for completion, answer in zip(completions, answers, strict=True)
+    ]
+
+
+class StreamingScorer:
+    """Score one completion incrementally as its text streams in.
+
+    `feed` each chunk of assistant text as it arrives; it returns True once
+    generation should be cancelled, and `finish` then returns the reward.
+    The reward is always what the rubric gives the text received:
+    `extract_answer` takes the last <answer> block (or \\boxed{}), so
+    stopping early never disagrees with scoring the same text in full.
+    `stop_reason` says how the reward was settled:
+
+    - "repetition": the last `repeat_window` characters recur
+      `repeat_count` times in the recent text, a runaway loop.
+    - "too_long": more than `max_chars` arrived.
+    - "answer": an <answer> block holding an integer closed after the last
+      </reasoning> (with `stop_on_answer`), or the stream ended with an
+      integer in its last <answer> block.
+    - None: the stream ended without one.
+
+    Only a block after </reasoning> stops the stream, as the response
+    format puts the answer there: inside the reasoning, models echo the
+    prompt's `<answer>...</answer>` template or try answers they later
+    revise, and without a </reasoning> there is no telling which block will
+    be the last. Pass `stop_on_answer=False` to always read to the end.
+
+        scorer = StreamingScorer(answer)
+        async for chunk in stream:
+            if scorer.feed(chunk.choices[0].delta.content or ""):
+                break
+        reward = scorer.finish()
+    """
+
+    def __init__(
+        self,
+        answer: str,
+        max_chars: int = 200_000,
+        repeat_window: int = 64,
+        repeat_count: int = 8,
+        stop_on_answer: bool = True,
+    ):
+        self.answer = _normalize_answer(answer)
+        self.max_chars = max_chars
+        self.repeat_window = repeat_window
+        self.repeat_count = repeat_count
+        self.stop_on_answer = stop_on_answer
+        self.reward: float | None = None
+        self.stop_reason: str | None = None
+        self._chunks: list[str] = []
+        self._length = 0
+        self._recent = ""
+        self._next_repeat_check = repeat_window * repeat_count
+        # Offset just past the last </reasoning> seen.
+        self._reasoning_end: int | None = None
+
+    def _settle(self, reason: str | None) -> float:
+        text = "".join(self._chunks)
+        predicted = extract_answer(text)
+        if reason is None:
+            raw = _last_answer_block(text)
+            if raw is not None and _INTEGER.fullmatch(_normalize_answer(raw)):
+                reason = "answer"
+        self.stop_reason = reason
+        self.reward = 1.0 if predicted == self.answer else 0.0
+        return self.reward
+
+    def feed(self, chunk: str) -> bool:
+        """Append `chunk`; True once generation should be cancelled."""
+        if self.reward is not None:
+            return True
+        # Tags can straddle chunks, so look back a tag's length into the text before.
+        lookback = self._recent[-len(_REASONING_CLOSE) + 1 :] + chunk
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+        if self.stop_on_answer and self._answer_closed(lookback):
+            self._settle("answer")
+            return True
+        # Only the tail of the text can show a loop.
+        self._recent = (self._recent + chunk)[-self.repeat_window * self.repeat_count * 4 :]
+        if self._length >= self._next_repeat_check:
+            self._next_repeat_check = self._length + self.repeat_window
+            if self._recent.count(self._recent[-self.repeat_window :]) >= self.repeat_count:
+                self._settle("repetition")
+                return True
+        if self._length > self.max_chars:
+            self._settle("too_long")
+            return True
+        return False
+
+    def _answer_closed(self, lookback: str) -> bool:
+        """Whether the text ending in `lookback` just closed an integer <answer> block after </reasoning>."""
+        reasoning_close = lookback.rfind(_REASONING_CLOSE)
+        if reasoning_close != -1:
+            self._reasoning_end = self._length - len(lookback) + reasoning_close + len(_REASONING_CLOSE)
+        if self._reasoning_end is None or _ANSWER_CLOSE not in lookback:
+            return False
+        raw = _last_answer_block("".join(self._chunks)[self._reasoning_end :])
+        return raw is not None and _INTEGER.fullmatch(_normalize_answer(raw)) is not None
+
+    def finish(self) -> float:
+        """Final reward, scored on all the text fed so far."""
+        if self.reward is None:
+            self._settle(None)
+        return self.reward
+
+
+class CurriculumSampler:
+    """Online curriculum that skews an example stream toward what the policy is learning.
+
+    Examples fall into difficulty slices by recurrence order k, target
+    direction, distance from the shown window (`steps`, bucketed by powers
+    of two) and magnitude (digits). `record` keeps the last `window` rewards
+    of each slice, so memory is bounded by the number of slices. `accept`
+    keeps an example with probability 4 p (1 - p), where p is its slice's
+    smoothed success rate: slices solved about half the time are always
+    kept, while slices the policy always or never solves are thinned down to
+    `floor`, which keeps them in the mix so that forgetting shows up.
+    Unseen slices count as p = 1/2 and are explored first.
+    """
 
-    return Dataset.from_list(examples)
+    def __init__(self, window: int = 64, floor: float = 0.05, seed: int = 0):
+        self.window = window
+        self.floor = floor
+        self.rewards: dict[tuple, deque[float]] = {}
+        self.rng = random.Random(seed)
+
+    @staticmethod
+    def slice_of(info: dict) -> tuple:
+        return (info["k"], info["direction"], info["steps"].bit_length(), info["magnitude"])
+
+    def success_rate(self, key: tuple) -> float:
+        rewards = self.rewards.get(key, ())
+        return (sum(rewards) + 1) / (len(rewards) + 2)
+
+    def weight(self, key: tuple) -> float:
+        p = self.success_rate(key)
+        return max(4 * p * (1 - p), self.floor)
+
+    def record(self, info: dict, reward: float) -> None:
+        key = self.slice_of(info)
+        if key not in self.rewards:
+            self.rewards[key] = deque(maxlen=self.window)
+        self.rewards[key].append(reward)
+
+    def accept(self, info: dict) -> bool:
+        return self.rng.random() < self.weight(self.slice_of(info))
+
+    def summary(self) -> str:
+        """Rollouts, success rate and sampling weight per slice seen so far."""
+        lines = [f"{'k':>2} {'direction':>9} {'steps':>7} {'digits':>6} {'n':>4} {'success':>8} {'weight':>7}"]
+        for key in sorted(self.rewards):
+            k, direction, bucket, digits = key
+            steps = f"{1 << bucket - 1}-{(1 << bucket) - 1}" if bucket > 1 else "1"
+            lines.append(
+                f"{k:>2} {direction:>9} {steps:>7} {digits:>6} {len(self.rewards[key]):>4} "
+                f"{self.success_rate(key):>8.2f} {self.weight(key):>7.2f}"
+            )
+        return "\n".join(lines)
 
 
 def load_environment(
@@ -158,25 +2043,122 @@ def load_environment(
     seed: int = 42,
     min_k: int = 2,
     max_k: int = 5,
+    max_start_idx: int = 24,
+    max_lookahead: int = _MAX_LOOKAHEAD,
+    jump_ahead: bool = False,
+    index_dir: str | None = None,
+    streaming: bool = False,
+    shard: int = 0,
+    num_shards: int = 1,
+    num_workers: int = 1,
+    cache: bool = True,
+    cache_dir: str | None = None,
+    profile: bool = False,
+    curriculum: bool = False,
+    split: str | None = None,
+    max_abs_value: int | None = _MAX_ABS_VALUE,
 ) -> vf.Environment:
-    """Load the numeric sequence inductive reasoning environment."""
-    dataset = _generate_dataset(
-        num_examples=num_examples, seed=seed, min_k=min_k, max_k=max_k
-    )
+    """Load the numeric sequence inductive reasoning environment.
+
+    With `streaming`, examples are generated as they are consumed,
+    deterministic per (seed, shard), and the dataset is a window of
+    `num_examples` rows that refills from the stream whenever rows are
+    selected (see `_StreamWindow`), so every pull, including each of the RL
+    trainer's batches, gets fresh problems. Shard 0 starts with the same
+    examples as the materialized dataset for `seed`. Otherwise `num_shards` and `num_workers` split
+    generation across a process pool (see `_generate_dataset`), and with
+    `cache` the result is stored in and reused from `cache_dir` (default
+    $NUM_SEQ_ENV_CACHE_DIR or ~/.cache/num_seq_env).
+
+    With `jump_ahead`, targets past the shown window are computed exactly
+    instead of simulated, so `max_lookahead` can be large; only the shown
+    terms are then bounded, and answers can have up to 4000 digits.
+
+    With `profile`, the dataset is generated afresh, bypassing the cache, and
+    its `GenerationStats` and a cProfile summary are logged (see
+    `_profiled_dataset`). It has no effect with `streaming`.
+
+    `curriculum` implies `streaming`: the stream is filtered by a
+    `CurriculumSampler` fed with every `exact_match` reward, so generation
+    follows the slices the policy currently solves about half the time. The
+    sampler is exposed as `env.curriculum`.
+
+    `max_abs_value` bounds the magnitude of every simulated term (None for
+    no bound). Raising it admits far more of the faster-growing, higher-order
+    recurrences that the default rejects; terms that outgrow int64 are
+    carried as Python ints and the filters stay exact.
+
+    With `split` ("train" or "eval"), examples are drawn only from that part
+    of the example space, so a training environment and an eval environment
+    never share a problem, whatever their seeds or settings.
+    """
+    import verifiers as vf
+    from datasets import IterableDataset
+
+    sampler = CurriculumSampler(seed=seed) if curriculum else None
+    streaming = streaming or curriculum
+    if streaming:
+        dataset = IterableDataset.from_generator(
+            _stream_examples,
+            gen_kwargs={
+                "seed": seed,
+                "shard": shard,
+                "max_start_idx": max_start_idx,
+                "min_k": min_k,
+                "max_k": max_k,
+                "index_dir": index_dir,
+                "max_lookahead": max_lookahead,
+                "jump_ahead": jump_ahead,
+                "max_abs_value": max_abs_value,
+                "split": split,
+                "curriculum": sampler,
+            },
+        )
+    else:
+        params = dict(
+            num_examples=num_examples,
+            seed=seed,
+            min_k=min_k,
+            max_k=max_k,
+            max_start_idx=max_start_idx,
+            index_dir=index_dir,
+            num_shards=num_shards,
+            max_lookahead=max_lookahead,
+            jump_ahead=jump_ahead,
+            max_abs_value=max_abs_value,
+            split=split,
+        )
+        if profile:
+            dataset = render_prompts(_profiled_dataset(num_workers=num_workers, **params))
+        elif cache:
+            dataset = _cached_dataset(cache_dir, num_workers=num_workers, rendered=True, **params)
+        else:
+            dataset = render_prompts(_generate_dataset(num_workers=num_workers, **params))
 
     parser = vf.XMLParser(["reasoning", "answer"])
 
-    async def exact_match(completion, answer, parser) -> float:
-        predicted = parser.parse_answer(completion)
-        if predicted is None:
-            return 0.0
-        return 1.0 if predicted.strip() == answer.strip() else 0.0
+    async def exact_match(completion, answer, info) -> float:
+        reward = score_completions([completion], [answer])[0]
+        if sampler is not None and info:
+            sampler.record(info, reward)
+        return reward
 
     rubric = vf.Rubric(funcs=[exact_match], parser=parser)
 
-    return vf.SingleTurnEnv(
-        dataset=dataset,
-        rubric=rubric,
-        parser=parser,
-        system_prompt=SYSTEM_PROMPT,
-    )
+    if streaming:
+        env = _streaming_env_cls()(
+            dataset=dataset,
+            rubric=rubric,
+            parser=parser,
+            system_prompt=SYSTEM_PROMPT,
+            window=num_examples,
+        )
+    else:
+        env = vf.SingleTurnEnv(
+            dataset=dataset,
+            rubric=rubric,
+            parser=parser,
+            system_prompt=SYSTEM_PROMPT,
+        )
+    env.curriculum = sampler
+    return env
@@ -1,55 +1,243 @@
-"""Bar chart of test accuracy per model on num_seq_env."""
+"""Accuracy figures for num_seq_env, rendered headless from cached aggregates.
 
+The results store (see results_store.py) is first brought up to date. Each
+run's Parquet file is then reduced to per-model sums and counts of the
+eval-time reward and of the rescored `correct` column (extract_answer, which
+also accepts \\boxed{}), overall and per recurrence order k and direction.
+These aggregates are cached in outputs/plot_cache.json under the file's
+mtime and size, so only new or re-ingested runs are read; the cached sums of
+all runs are merged into the figures' data.
+
+Every figure's data is hashed together with this script's source, and a
+figure is re-rendered only when that hash differs from the one recorded at
+its last render, or its file is missing. When nothing changed, matplotlib is
+not even imported. Figures are drawn with the Agg backend and written to
+outputs/:
+
+- accuracy_by_model.png: eval-time accuracy per model, with the rescored
+  accuracy as a translucent bar wherever it is higher.
+- accuracy_by_k.png, accuracy_by_direction.png: accuracy per model and slice.
+- accuracy_by_k_rescored.png, accuracy_by_direction_rescored.png: the same,
+  rescored.
+
+    python plot_accuracy.py
+    python plot_accuracy.py --dry-run
+    python plot_accuracy.py --force
+"""
+
+import argparse
+import hashlib
 import json
 from pathlib import Path
 
-import matplotlib.pyplot as plt
-
-EVALS_DIR = Path(__file__).parent / "outputs" / "evals"
-INTELLECT3_RESCORED = 0.73
-
-# Load model names and avg_reward from metadata.json
-models = []
-accuracies = []
-for model_dir in sorted(EVALS_DIR.iterdir()):
-    if not model_dir.is_dir():
-        continue
-    parts = model_dir.name.split("--")
-    model_name = parts[1] + "/" + parts[2]
-    metadata_files = list(model_dir.glob("*/metadata.json"))
-    with open(metadata_files[0]) as f:
-        meta = json.load(f)
-    models.append(model_name)
-    accuracies.append(meta["avg_reward"])
-
-fig, ax = plt.subplots(figsize=(10, 6))
-
-bars = ax.bar(models, accuracies, color="#4C72B0", zorder=3)
-
-# Add semi-transparent rescored bar for intellect-3
-intellect_idx = models.index("prime-intellect/intellect-3")
-ax.bar(
-    models[intellect_idx],
-    INTELLECT3_RESCORED,
-    color="#4C72B0",
-    alpha=0.3,
-    zorder=2,
-    label=f"intellect-3 rescored (xml + \\boxed{{}}): {INTELLECT3_RESCORED:.0%}",
-)
-
-# Labels on bars
-for i, (bar, acc) in enumerate(zip(bars, accuracies)):
-    ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + 0.01,
-            f"{acc:.0%}", ha="center", va="bottom", fontweight="bold")
-
-ax.set_ylabel("Test Accuracy")
-ax.set_title("num_seq_env — Test Accuracy by Model")
-ax.set_ylim(0, 1.0)
-ax.grid(axis="y", alpha=0.3)
-ax.legend()
-
-plt.xticks(rotation=20, ha="right")
-plt.tight_layout()
-plt.savefig(Path(__file__).parent / "outputs" / "accuracy_by_model.png", dpi=150)
-plt.show()
-print("Saved to outputs/accuracy_by_model.png")
+import pyarrow.parquet as pq
+
+from results_store import STORE_DIR, ingest
+
+OUTPUT_DIR = Path(__file__).parent / "outputs"
+CACHE_FILE = OUTPUT_DIR / "plot_cache.json"
+SLICE_KEYS = ["k", "direction"]
+METRICS = ["reward", "correct"]
+RESCORED_LABEL = "rescored (xml + \\boxed{})"
+TITLE_SUFFIXES = {"reward": "", "correct": ", rescored"}
+COLOR = "#4C72B0"
+
+
+def run_aggregates(parquet_file: Path) -> dict[str, list]:
+    """Per-model sums and counts of each metric, overall and per slice key.
+
+    Rows are [model, slice value, reward_sum, reward_count, correct_sum,
+    correct_count]; the slice value is null for the overall group.
+    """
+    table = pq.read_table(parquet_file, columns=["model", *SLICE_KEYS, *METRICS])
+    table = table.set_column(table.schema.get_field_index("correct"), "correct", table["correct"].cast("float64"))
+    aggregations = [(metric, agg) for metric in METRICS for agg in ("sum", "count")]
+    groups = {}
+    for key in [None, *SLICE_KEYS]:
+        group = ["model"] if key is None else ["model", key]
+        grouped = table.group_by(group).aggregate(aggregations).to_pylist()
+        groups[key or "model"] = [
+            [row["model"], None if key is None else row[key]]
+            + [row[f"{metric}_{agg}"] or 0 for metric, agg in aggregations]
+            for row in grouped
+        ]
+    return groups
+
+
+def update_aggregates(store_dir: Path = STORE_DIR, cache: dict | None = None) -> dict:
+    """Bring the cached per-run aggregates up to date with the store.
+
+    Runs whose Parquet file has the same mtime and size as when they were
+    aggregated are reused; runs no longer in the store are dropped.
+    """
+    cached = (cache or {}).get("runs", {})
+    runs = {}
+    for parquet_file in sorted(store_dir.glob("*.parquet")):
+        stat = parquet_file.stat()
+        stamp = [stat.st_mtime_ns, stat.st_size]
+        entry = cached.get(parquet_file.name)
+        if entry is None or entry["stamp"] != stamp:
+            entry = {"stamp": stamp, "groups": run_aggregates(parquet_file)}
+        runs[parquet_file.name] = entry
+    return runs
+
+
+def merge_aggregates(runs: dict) -> dict[str, dict]:
+    """Accuracy per metric, model and slice value over all runs.
+
+    Returns {group: {model: {slice value: {"reward", "correct", "n"}}}},
+    with slice values as strings (JSON keys) and None for the overall group.
+    """
+    sums: dict[str, dict] = {}
+    for entry in runs.values():
+        for group, rows in entry["groups"].items():
+            for model, value, *counts in rows:
+                acc = sums.setdefault(group, {}).setdefault(model, {}).setdefault(str(value), [0.0] * len(counts))
+                for i, count in enumerate(counts):
+                    acc[i] += count
+    merged = {}
+    for group, by_model in sums.items():
+        merged[group] = {
+            model: {
+                value: {
+                    "reward": reward_sum / reward_count if reward_count else None,
+                    "correct": correct_sum / correct_count if correct_count else None,
+                    "n": int(reward_count),
+                }
+                for value, (reward_sum, reward_count, correct_sum, correct_count) in sorted(
+                    by_value.items(), key=lambda item: _slice_order(item[0])
+                )
+            }
+            for model, by_value in sorted(by_model.items())
+        }
+    return merged
+
+
+def _slice_order(value: str) -> tuple:
+    # k sorts numerically, direction alphabetically.
+    return (0, int(value), "") if value.lstrip("-").isdigit() else (1, 0, value)
+
+
+def figure_data(merged: dict) -> dict[str, dict]:
+    """The data each figure is drawn from, by output file name."""
+    figures = {
+        "accuracy_by_model.png": {
+            model: by_value["None"] for model, by_value in merged.get("model", {}).items()
+        }
+    }
+    for key in SLICE_KEYS:
+        for metric in METRICS:
+            name = f"accuracy_by_{key}.png" if metric == "reward" else f"accuracy_by_{key}_rescored.png"
+            figures[name] = {
+                "key": key,
+                "metric": metric,
+                "models": {
+                    model: {value: cell[metric] for value, cell in by_value.items()}
+                    for model, by_value in merged.get(key, {}).items()
+                },
+            }
+    return figures
+
+
+def figure_digest(data: dict) -> str:
+    """Hash of a figure's data and of the code that draws it."""
+    digest = hashlib.sha256(Path(__file__).read_bytes())
+    digest.update(json.dumps(data, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def plot_by_model(ax, data: dict) -> None:
+    models = list(data)
+    accuracies = [cell["reward"] or 0.0 for cell in data.values()]
+    bars = ax.bar(models, accuracies, color=COLOR, zorder=3)
+    rescored = [(model, cell["correct"]) for model, cell in data.items() if (cell["correct"] or 0.0) > (cell["reward"] or 0.0)]
+    for i, (model, accuracy) in enumerate(rescored):
+        ax.bar(model, accuracy, color=COLOR, alpha=0.3, zorder=2, label=RESCORED_LABEL if i == 0 else None)
+        ax.text(model, accuracy + 0.01, f"{accuracy:.0%}", ha="center", va="bottom", alpha=0.6)
+    for bar, accuracy in zip(bars, accuracies):
+        ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + 0.01,
+                f"{accuracy:.0%}", ha="center", va="bottom", fontweight="bold")
+    ax.set_title("num_seq_env — Test Accuracy by Model")
+    if rescored:
+        ax.legend()
+    ax.tick_params(axis="x", labelrotation=20)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment("right")
+
+
+def plot_by_slice(ax, data: dict) -> None:
+    models = data["models"]
+    values = sorted({value for by_value in models.values() for value in by_value}, key=_slice_order)
+    width = 0.8 / max(len(models), 1)
+    for i, (model, by_value) in enumerate(models.items()):
+        xs = [j + (i - (len(models) - 1) / 2) * width for j in range(len(values))]
+        ys = [by_value.get(value) or 0.0 for value in values]
+        ax.bar(xs, ys, width, label=model, zorder=3)
+    ax.set_xticks(range(len(values)), [f"{data['key']}={value}" for value in values])
+    ax.set_title(f"num_seq_env — Test Accuracy by {data['key']}{TITLE_SUFFIXES[data['metric']]}")
+    ax.legend(fontsize="small", ncols=3, loc="upper center", bbox_to_anchor=(0.5, -0.06))
+
+
+def render(figures: dict[str, dict], output_dir: Path) -> None:
+    """Draw and save the given figures with the Agg backend."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    for name, data in figures.items():
+        fig, ax = plt.subplots(figsize=(10, 6))
+        if name == "accuracy_by_model.png":
+            plot_by_model(ax, data)
+        else:
+            plot_by_slice(ax, data)
+        ax.set_ylabel("Test Accuracy")
+        ax.set_ylim(0, 1.0)
+        ax.grid(axis="y", alpha=0.3)
+        fig.tight_layout()
+        fig.savefig(output_dir / name, dpi=150)
+        plt.close(fig)
+
+
+def update_figures(
+    store_dir: Path = STORE_DIR,
+    output_dir: Path = OUTPUT_DIR,
+    cache_file: Path = CACHE_FILE,
+    force: bool = False,
+    dry_run: bool = False,
+) -> list[str]:
+    """Re-render the figures whose data changed; returns their names."""
+    cache = json.loads(cache_file.read_text()) if cache_file.exists() else {}
+    runs = update_aggregates(store_dir, cache)
+    figures = figure_data(merge_aggregates(runs))
+    digests = {name: figure_digest(data) for name, data in figures.items()}
+    rendered = cache.get("figures", {})
+    stale = {
+        name: data
+        for name, data in figures.items()
+        if force or rendered.get(name) != digests[name] or not (output_dir / name).exists()
+    }
+    if dry_run:
+        return list(stale)
+    if stale:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        render(stale, output_dir)
+    cache = {"runs": runs, "figures": {name: digests[name] for name in figures if name in stale or name in rendered}}
+    tmp = cache_file.with_suffix(".tmp")
+    tmp.write_text(json.dumps(cache))
+    tmp.replace(cache_file)
+    return list(stale)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--force", action="store_true", help="re-render every figure")
+    arg_parser.add_argument("--dry-run", action="store_true", help="only list the figures that would be re-rendered")
+    args = arg_parser.parse_args()
+
+    ingest()
+    names = update_figures(force=args.force, dry_run=args.dry_run)
+    verb = "Would render" if args.dry_run else "Rendered"
+    print(f"{verb} {len(names)} figure(s)")
+    for name in names:
+        print(f"  outputs/{name}")
@@ -0,0 +1,142 @@
+"""Rescore every stored completion under several answer-extraction strategies.
+
+Reads completions from the results store (see results_store.py), so no model
+is queried and no JSON is re-parsed. Run files are spread over a process
+pool and each worker applies every strategy to a whole column of
+completions at once, so comparing extraction policies across tens of
+thousands of completions takes seconds.
+
+A strategy is a base extractor name or a fallback chain joined with "+",
+e.g. "xml_last+boxed" takes the last <answer> block and falls back to the
+last \\boxed{}. Extracted values are normalized as integers before being
+compared with the ground truth.
+
+    python rescore.py
+    python rescore.py -s xml_first -s xml_last+boxed+last_int --workers 4
+"""
+
+import argparse
+import re
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from num_seq_env import _last_answer_block, _last_boxed, _normalize_answer
+from results_store import STORE_DIR, ingest
+
+xml_pattern = re.compile(r"<answer>\s*(.*?)\s*</answer>", re.DOTALL)
+integer_pattern = re.compile(r"[+-]?\d[\d,]*")
+answer_is_pattern = re.compile(r"answer is[\s:*$]*([+-]?\d[\d,]*)", re.IGNORECASE)
+
+
+def xml_first(text: str) -> str | None:
+    """First <answer> block, as XMLParser finds it."""
+    match = xml_pattern.search(text)
+    return match.group(1) if match else None
+
+
+def last_int(text: str) -> str | None:
+    """Last integer anywhere in the text."""
+    found = integer_pattern.findall(text)
+    return found[-1] if found else None
+
+
+def answer_is(text: str) -> str | None:
+    """Integer after the last "answer is"."""
+    found = answer_is_pattern.findall(text)
+    return found[-1] if found else None
+
+
+EXTRACTORS: dict[str, Callable[[str], str | None]] = {
+    "xml_first": xml_first,
+    "xml_last": _last_answer_block,
+    "boxed": _last_boxed,
+    "answer_is": answer_is,
+    "last_int": last_int,
+}
+
+DEFAULT_STRATEGIES = [
+    "xml_first",
+    "xml_last",
+    "boxed",
+    "xml_last+boxed",
+    "xml_last+boxed+answer_is",
+    "xml_last+boxed+last_int",
+    "last_int",
+]
+
+
+def extract_column(texts: list[str], strategy: str) -> pa.Array:
+    """Normalized answers of every text under a fallback chain of extractors."""
+    parsed: list[str | None] = [None] * len(texts)
+    pending = range(len(texts))
+    for name in strategy.split("+"):
+        extractor = EXTRACTORS[name]
+        still = []
+        for i in pending:
+            raw = extractor(texts[i])
+            if raw is None:
+                still.append(i)
+            else:
+                parsed[i] = _normalize_answer(raw)
+        pending = still
+    return pa.array(parsed, pa.string())
+
+
+def rescore_file(path: Path, strategies: list[str]) -> tuple[str, int, dict[str, int]]:
+    """(model, rows, correct count per strategy) for one run file of the store."""
+    table = pq.read_table(path, columns=["model", "answer", "reward", "completion_text"])
+    texts = table["completion_text"].to_pylist()
+    answers = table["answer"]
+    correct = {"reward": int(pc.sum(pc.cast(table["reward"], pa.int64())).as_py() or 0)}
+    for strategy in strategies:
+        hits = pc.equal(extract_column(texts, strategy), answers)
+        correct[strategy] = int(pc.sum(pc.fill_null(hits, False)).as_py() or 0)
+    return table["model"][0].as_py(), table.num_rows, correct
+
+
+def rescore(
+    strategies: list[str], workers: int = 1, store_dir: Path = STORE_DIR
+) -> dict[str, dict[str, float]]:
+    """Accuracy per model (rows) and strategy (columns), eval-time reward included."""
+    unknown = {name for s in strategies for name in s.split("+")} - EXTRACTORS.keys()
+    if unknown:
+        raise ValueError(f"Unknown extractors {sorted(unknown)}; choose from {sorted(EXTRACTORS)}")
+    files = sorted(store_dir.glob("*.parquet"))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(rescore_file, files, [strategies] * len(files)))
+    else:
+        results = [rescore_file(path, strategies) for path in files]
+
+    totals: dict[str, tuple[int, dict[str, int]]] = {}
+    for model, rows, correct in results:
+        n, counts = totals.get(model, (0, {}))
+        totals[model] = (n + rows, {key: counts.get(key, 0) + value for key, value in correct.items()})
+    return {model: {key: value / n for key, value in counts.items()} for model, (n, counts) in sorted(totals.items())}
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("-s", "--strategy", action="append", dest="strategies", help=f"extractors: {', '.join(EXTRACTORS)}")
+    arg_parser.add_argument("--workers", type=int, default=1)
+    arg_parser.add_argument("--csv", type=Path, help="also write the matrix here")
+    args = arg_parser.parse_args()
+    strategies = args.strategies or DEFAULT_STRATEGIES
+
+    ingest()
+    matrix = rescore(strategies, args.workers)
+
+    columns = ["reward", *strategies]
+    width = max(len(model) for model in matrix)
+    print(f"{'model':<{width}}  " + "  ".join(f"{c:>{max(len(c), 6)}}" for c in columns))
+    for model, row in matrix.items():
+        print(f"{model:<{width}}  " + "  ".join(f"{row[c]:>{max(len(c), 6)}.3f}" for c in columns))
+    if args.csv:
+        lines = [",".join(["model", *columns])]
+        lines += [",".join([model, *(f"{row[c]:.4f}" for c in columns)]) for model, row in matrix.items()]
+        args.csv.write_text("\n".join(lines) + "\n")
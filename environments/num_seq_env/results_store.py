@@ -0,0 +1,252 @@
+"""Columnar store of eval results for fast cross-model queries.
+
+`python results_store.py` ingests every results.jsonl under outputs/evals into
+outputs/results_store/, one Parquet file per eval run. Each Parquet file
+records the store version and the SHA-256 of the results.jsonl it was built
+from, and runs whose file matches both are skipped, so re-ingesting is cheap
+and any edit to a results.jsonl or to how rows are derived is picked up.
+Each file holds a single model and is sorted by example_id, so filters on
+(model, example_id) prune files and row groups from their statistics.
+
+Besides the raw record fields, every row carries columns derived from the
+prompt and completion:
+
+- start_idx, end_idx, target_pos: positions from the prompt text.
+- direction ("forward" or "backward") and steps: where the target lies
+  relative to the shown window and how far from it.
+- k: recurrence order, from the example's info when the run recorded it, else
+  the largest j whose j x j Hankel determinant over the shown terms is
+  non-zero (generation guarantees it for the true order).
+- max_abs_shown: largest shown magnitude.
+- parsed_answer / parsed_via ("answer", "boxed" or null) from extract_answer,
+  and correct, whether parsed_answer matches the ground truth.
+"""
+
+import hashlib
+import json
+import re
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from num_seq_env import _hankel_det, _last_answer_block, _normalize_answer, extract_answer
+
+EVALS_DIR = Path(__file__).parent / "outputs" / "evals"
+STORE_DIR = Path(__file__).parent / "outputs" / "results_store"
+ROW_GROUP_SIZE = 4096
+# Bump when the derived columns change, so that every run is re-ingested.
+STORE_VERSION = 1
+
+prompt_pattern = re.compile(
+    r"Here are terms (\d+) through (\d+) of a sequence:\n(.*?)\n\nWhat is term (\d+) of the sequence\?"
+)
+
+SCHEMA = pa.schema(
+    [
+        ("model", pa.string()),
+        ("run_id", pa.string()),
+        ("example_id", pa.int64()),
+        ("rollout", pa.int32()),
+        ("answer", pa.string()),
+        ("reward", pa.float64()),
+        ("exact_match", pa.float64()),
+        ("error", pa.string()),
+        ("generation_ms", pa.float64()),
+        ("total_ms", pa.float64()),
+        ("start_idx", pa.int32()),
+        ("end_idx", pa.int32()),
+        ("target_pos", pa.int32()),
+        ("direction", pa.string()),
+        ("steps", pa.int32()),
+        ("k", pa.int32()),
+        ("shown", pa.list_(pa.int64())),
+        ("max_abs_shown", pa.int64()),
+        ("completion_text", pa.string()),
+        ("completion_chars", pa.int64()),
+        ("parsed_answer", pa.string()),
+        ("parsed_via", pa.string()),
+        ("correct", pa.bool_()),
+    ]
+)
+
+
+def recurrence_order(terms: list[int]) -> int:
+    """Order of the recurrence behind `terms`: the largest non-singular Hankel size."""
+    for j in range((len(terms) + 1) // 2, 0, -1):
+        if _hankel_det(terms, j) != 0:
+            return j
+    return 0
+
+
+def parse_prompt(prompt: list[dict], info: dict | None = None) -> dict:
+    """Positions, shown terms and derived slice columns of one problem prompt.
+
+    The order k comes from the example's `info` when the run recorded it.
+    """
+    user = next(msg["content"] for msg in prompt if msg["role"] == "user")
+    start, end, terms, target = prompt_pattern.search(user).groups()
+    start, end, target = int(start), int(end), int(target)
+    shown = [int(t) for t in terms.split(", ")]
+    forward = target > end
+    return {
+        "start_idx": start,
+        "end_idx": end,
+        "target_pos": target,
+        "direction": "forward" if forward else "backward",
+        "steps": target - end if forward else start - target,
+        "k": info["k"] if info else recurrence_order(shown),
+        "shown": shown,
+        "max_abs_shown": max(abs(t) for t in shown),
+    }
+
+
+def completion_columns(completion: list[dict], answer: str) -> dict:
+    text = "\n".join(
+        str(msg["content"])
+        for msg in completion
+        if msg.get("role") == "assistant" and msg.get("content") is not None
+    )
+    parsed = extract_answer(completion)
+    if parsed is None:
+        via = None
+    elif _last_answer_block(text) is not None:
+        via = "answer"
+    else:
+        via = "boxed"
+    return {
+        "completion_text": text,
+        "completion_chars": len(text),
+        "parsed_answer": parsed,
+        "parsed_via": via,
+        "correct": parsed == _normalize_answer(answer),
+    }
+
+
+def model_name(run_dir: Path) -> str:
+    """Model of an eval run, from its metadata.json, else its directory name.
+
+    Run directories are <env>--<model with "/" as "--">/<run_id>, and the
+    model need not contain a "/" (e.g. an endpoint alias like gpt-4.1).
+    """
+    metadata = run_dir / "metadata.json"
+    if metadata.exists():
+        return json.loads(metadata.read_text())["model"]
+    return "/".join(run_dir.parent.name.split("--")[1:])
+
+
+def ingest_run(results_file: Path, model: str, run_id: str) -> pa.Table:
+    """One eval run as a table sorted by (example_id, rollout)."""
+    rows = []
+    rollouts: dict[int, int] = {}
+    prompts: dict[str, dict] = {}
+    with open(results_file) as f:
+        for line in f:
+            rec = json.loads(line)
+            eid = rec["example_id"]
+            rollouts[eid] = rollouts.get(eid, -1) + 1
+            # Rollouts of one example share a prompt; parse it once.
+            prompt_key = json.dumps(rec["prompt"])
+            if prompt_key not in prompts:
+                prompts[prompt_key] = parse_prompt(rec["prompt"], rec.get("info"))
+            rows.append(
+                {
+                    "model": model,
+                    "run_id": run_id,
+                    "example_id": eid,
+                    "rollout": rollouts[eid],
+                    "answer": rec["answer"],
+                    "reward": rec["reward"],
+                    "exact_match": rec.get("exact_match"),
+                    "error": rec.get("error"),
+                    "generation_ms": rec.get("generation_ms"),
+                    "total_ms": rec.get("total_ms"),
+                    **prompts[prompt_key],
+                    **completion_columns(rec["completion"], rec["answer"]),
+                }
+            )
+    rows.sort(key=lambda row: (row["example_id"], row["rollout"]))
+    return pa.Table.from_pylist(rows, schema=SCHEMA)
+
+
+def store_metadata(results_file: Path) -> dict[bytes, bytes]:
+    """Parquet metadata identifying what a run's file is built from."""
+    source = hashlib.sha256(results_file.read_bytes()).hexdigest()
+    return {b"store_version": str(STORE_VERSION).encode(), b"source_sha256": source.encode()}
+
+
+def ingest(evals_dir: Path = EVALS_DIR, store_dir: Path = STORE_DIR) -> list[Path]:
+    """Convert new or changed results.jsonl files; returns the Parquet files written."""
+    store_dir.mkdir(parents=True, exist_ok=True)
+    written, live = [], set()
+    for results_file in sorted(evals_dir.glob("*/*/results.jsonl")):
+        model_dir, run_id = results_file.parent.parent, results_file.parent.name
+        out = store_dir / f"{model_dir.name}--{run_id}.parquet"
+        live.add(out)
+        metadata = store_metadata(results_file)
+        if out.exists():
+            stored = pq.read_schema(out).metadata or {}
+            if all(stored.get(key) == value for key, value in metadata.items()):
+                continue
+        table = ingest_run(results_file, model_name(results_file.parent), run_id)
+        table = table.replace_schema_metadata(metadata)
+        tmp = out.with_suffix(".tmp")
+        pq.write_table(table, tmp, row_group_size=ROW_GROUP_SIZE)
+        tmp.replace(out)
+        written.append(out)
+    # Drop runs whose results.jsonl is gone.
+    for stale in set(store_dir.glob("*.parquet")) - live:
+        stale.unlink()
+    return written
+
+
+def load(
+    columns: list[str] | None = None,
+    filter: pc.Expression | None = None,
+    store_dir: Path = STORE_DIR,
+) -> pa.Table:
+    """Read the store, e.g. load(["model", "k", "reward"], pc.field("k") == 5)."""
+    return ds.dataset(store_dir, format="parquet", schema=SCHEMA).to_table(
+        columns=columns, filter=filter
+    )
+
+
+def accuracy_by(
+    *keys: str,
+    metric: str = "reward",
+    filter: pc.Expression | None = None,
+    store_dir: Path = STORE_DIR,
+) -> pa.Table:
+    """Mean of `metric` and row count per model and the given slice columns."""
+    group = ["model", *keys]
+    table = load([*group, metric], filter, store_dir)
+    if table.schema.field(metric).type == pa.bool_():
+        table = table.set_column(
+            table.schema.get_field_index(metric), metric, pc.cast(table[metric], pa.float64())
+        )
+    return (
+        table.group_by(group)
+        .aggregate([(metric, "mean"), (metric, "count")])
+        .sort_by([(key, "ascending") for key in group])
+    )
+
+
+if __name__ == "__main__":
+    written = ingest()
+    print(f"Ingested {len(written)} run(s) into {STORE_DIR}\n")
+
+    by_model = accuracy_by().to_pylist()
+    rescored = {row["model"]: row["correct_mean"] for row in accuracy_by(metric="correct").to_pylist()}
+    print(f"{'model':<34} {'n':>5} {'reward':>7} {'rescored':>9}")
+    for row in by_model:
+        print(
+            f"{row['model']:<34} {row['reward_count']:>5} {row['reward_mean']:>7.3f} "
+            f"{rescored[row['model']]:>9.3f}"
+        )
+
+    for key in ("k", "direction"):
+        print(f"\nAccuracy by model and {key}:")
+        for row in accuracy_by(key).to_pylist():
+            print(f"  {row['model']:<34} {key}={row[key]!s:<9} {row['reward_mean']:.3f} (n={row['reward_count']})")
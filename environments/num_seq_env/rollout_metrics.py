@@ -0,0 +1,275 @@
+"""pass@k, majority-vote accuracy and per-example variance across rollouts.
+
+Rollouts are reduced to tallies, one row per (model, run_id, example_id,
+parsed_answer) with the number of rollouts and the sums of their rewards,
+squared rewards and passes (reward >= 1). Every metric follows from the
+tallies with a few vectorized group-bys, and tallies of disjoint sets of
+rollouts merge by summing, so new rollouts can be folded in without
+touching the old ones.
+
+By default the tallies are computed from the results store (see
+results_store.py). With --incremental they are kept in
+outputs/rollout_tallies.parquet together with how far each results.jsonl
+has been read, and each run only parses the lines appended since the last
+one (run_evals.py appends rollouts as they finish).
+
+Per model, over its examples, where an example is an example_id within one
+run (runs may draw their datasets with different seeds or settings, so the
+same example_id can name different problems):
+
+- mean_reward: mean reward over all rollouts.
+- pass@k: the unbiased estimator 1 - C(n - c, k) / C(n, k) of the chance
+  that at least one of k rollouts passes, for an example with n rollouts of
+  which c pass; examples with fewer than k rollouts are left out.
+- maj: share of examples whose most common parsed answer (ties go to the
+  smallest) is the ground truth; unparsed rollouts do not vote.
+- variance: mean over examples of the variance of their rollout rewards.
+
+Answers are parsed with extract_answer, as for the store's `correct`
+column, which also accepts \\boxed{}; where the eval-time reward missed
+those, maj can beat pass@1 even with one rollout. --metric correct scores
+every metric on the parsed answers instead of the eval-time reward.
+
+    python rollout_metrics.py
+    python rollout_metrics.py -k 1 -k 8 --incremental
+    python rollout_metrics.py --metric correct
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from results_store import EVALS_DIR, STORE_DIR, completion_columns, ingest, load, model_name
+
+TALLIES_FILE = Path(__file__).parent / "outputs" / "rollout_tallies.parquet"
+
+EXAMPLE_KEYS = ["model", "run_id", "example_id"]
+TALLY_KEYS = [*EXAMPLE_KEYS, "answer", "parsed_answer"]
+TALLY_SUMS = ["rollouts", "reward_sum", "reward_sq_sum", "passes"]
+TALLY_SCHEMA = pa.schema(
+    [
+        ("model", pa.string()),
+        ("run_id", pa.string()),
+        ("example_id", pa.int64()),
+        ("answer", pa.string()),
+        ("parsed_answer", pa.string()),
+        ("rollouts", pa.int64()),
+        ("reward_sum", pa.float64()),
+        ("reward_sq_sum", pa.float64()),
+        ("passes", pa.int64()),
+    ]
+)
+ROLLOUT_SCHEMA = pa.schema([*(TALLY_SCHEMA.field(key) for key in TALLY_KEYS), ("reward", pa.float64())])
+
+
+def combine(tallies: pa.Table) -> pa.Table:
+    """Sum tallies that share a key."""
+    grouped = tallies.group_by(TALLY_KEYS).aggregate([(column, "sum") for column in TALLY_SUMS])
+    return grouped.rename_columns([*TALLY_KEYS, *TALLY_SUMS]).select(TALLY_SCHEMA.names).cast(TALLY_SCHEMA)
+
+
+def tally(rollouts: pa.Table) -> pa.Table:
+    """Tallies of a table with one row per rollout (the results store's columns)."""
+    reward = pc.fill_null(pc.cast(rollouts["reward"], pa.float64()), 0.0)
+    table = pa.table(
+        {
+            **{key: rollouts[key] for key in TALLY_KEYS},
+            "rollouts": pa.array(np.ones(rollouts.num_rows, dtype=np.int64)),
+            "reward_sum": reward,
+            "reward_sq_sum": pc.multiply(reward, reward),
+            "passes": pc.cast(pc.greater_equal(reward, 1.0), pa.int64()),
+        }
+    )
+    return combine(table)
+
+
+def tallies_from_store(store_dir: Path = STORE_DIR) -> pa.Table:
+    return tally(load(ROLLOUT_SCHEMA.names, store_dir=store_dir))
+
+
+def update_tallies(evals_dir: Path = EVALS_DIR, tallies_file: Path = TALLIES_FILE) -> tuple[pa.Table, int]:
+    """Fold rollouts appended to any results.jsonl since the last update into the saved tallies.
+
+    Returns the tallies and the number of rollouts read. Only complete lines
+    are consumed, so a rollout being written is picked up next time. A file
+    that shrank was rewritten, and its run is recounted from the start.
+    """
+    if tallies_file.exists():
+        tallies = pq.read_table(tallies_file)
+        offsets = json.loads(tallies.schema.metadata[b"offsets"])
+        tallies = tallies.replace_schema_metadata(None)
+    else:
+        tallies, offsets = TALLY_SCHEMA.empty_table(), {}
+
+    rows = []
+    live = set()
+    for results_file in sorted(evals_dir.glob("*/*/results.jsonl")):
+        run_id = results_file.parent.name
+        key = str(results_file.relative_to(evals_dir))
+        live.add(key)
+        offset = offsets.get(key, 0)
+        if results_file.stat().st_size < offset:
+            tallies = tallies.filter(pc.field("run_id") != run_id)
+            offset = 0
+        with open(results_file, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        complete = data[: data.rfind(b"\n") + 1]
+        offsets[key] = offset + len(complete)
+        model = model_name(results_file.parent)
+        for line in complete.splitlines():
+            rec = json.loads(line)
+            rows.append(
+                {
+                    "model": model,
+                    "run_id": run_id,
+                    "example_id": rec["example_id"],
+                    "answer": rec["answer"],
+                    "parsed_answer": completion_columns(rec["completion"], rec["answer"])["parsed_answer"],
+                    "reward": rec["reward"],
+                }
+            )
+    # Drop runs whose results.jsonl is gone.
+    for stale in offsets.keys() - live:
+        tallies = tallies.filter(pc.field("run_id") != Path(stale).parent.name)
+        del offsets[stale]
+
+    if rows:
+        new = tally(pa.Table.from_pylist(rows, schema=ROLLOUT_SCHEMA))
+        tallies = combine(pa.concat_tables([tallies, new]))
+    tallies_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = tallies_file.with_suffix(".tmp")
+    pq.write_table(tallies.replace_schema_metadata({"offsets": json.dumps(offsets)}), tmp)
+    tmp.replace(tallies_file)
+    return tallies, len(rows)
+
+
+def pass_at_k(n: np.ndarray, c: np.ndarray, k: int) -> np.ndarray:
+    """Unbiased pass@k per example, 1 - C(n - c, k) / C(n, k); NaN where n < k.
+
+    The ratio is the product over j < k of (n - c - j) / (n - j), taken for
+    all examples at once.
+    """
+    n, c = n.astype(np.float64), c.astype(np.float64)
+    fail = np.ones(len(n))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for j in range(k):
+            fail *= np.clip((n - c - j) / (n - j), 0.0, 1.0)
+    return np.where(n >= k, 1.0 - fail, np.nan)
+
+
+def rescore_tallies(tallies: pa.Table) -> pa.Table:
+    """Tallies whose rewards are 1 where the parsed answer is the ground truth, else 0."""
+    correct = pc.fill_null(pc.equal(tallies["parsed_answer"], tallies["answer"]), False)
+    hits = pc.if_else(correct, tallies["rollouts"], 0)
+    for column, values in [
+        ("reward_sum", pc.cast(hits, pa.float64())),
+        ("reward_sq_sum", pc.cast(hits, pa.float64())),
+        ("passes", hits),
+    ]:
+        tallies = tallies.set_column(tallies.schema.get_field_index(column), column, values)
+    return tallies
+
+
+def example_metrics(tallies: pa.Table) -> pa.Table:
+    """One row per (model, run_id, example_id): rollouts, passes, mean and variance of reward, majority correct."""
+    order = [(key, "ascending") for key in EXAMPLE_KEYS]
+    per_example = (
+        tallies.group_by(EXAMPLE_KEYS)
+        .aggregate([(column, "sum") for column in TALLY_SUMS])
+        .rename_columns([*EXAMPLE_KEYS, *TALLY_SUMS])
+        .sort_by(order)
+    )
+    n = per_example["rollouts"].to_numpy()
+    mean = per_example["reward_sum"].to_numpy() / n
+    variance = np.maximum(per_example["reward_sq_sum"].to_numpy() / n - mean**2, 0.0)
+
+    # Votes per parsed answer, most first and ties to the smallest answer;
+    # the first row of each example's votes is the majority answer.
+    votes = (
+        tallies.filter(pc.is_valid(tallies["parsed_answer"]))
+        .group_by(TALLY_KEYS)
+        .aggregate([("rollouts", "sum")])
+        .sort_by([*order, ("rollouts_sum", "descending"), ("parsed_answer", "ascending")])
+    )
+    first = np.ones(votes.num_rows, dtype=bool)
+    first[1:] = False
+    for key in EXAMPLE_KEYS:
+        values = votes[key].to_numpy(zero_copy_only=False)
+        first[1:] |= values[1:] != values[:-1]
+    majority = votes.filter(pa.array(first)).select(EXAMPLE_KEYS).append_column(
+        "majority_correct",
+        pc.equal(votes["parsed_answer"].filter(pa.array(first)), votes["answer"].filter(pa.array(first))),
+    )
+
+    per_example = per_example.append_column("mean_reward", pa.array(mean)).append_column(
+        "variance", pa.array(variance)
+    )
+    joined = per_example.join(majority, EXAMPLE_KEYS, join_type="left outer")
+    return joined.set_column(
+        joined.schema.get_field_index("majority_correct"),
+        "majority_correct",
+        pc.fill_null(joined["majority_correct"], False),
+    ).sort_by(order)
+
+
+def model_metrics(tallies: pa.Table, ks: list[int]) -> dict[str, dict[str, float]]:
+    """Per model: examples, mean rollouts per example, mean_reward, pass@k for each k, maj and variance."""
+    examples = example_metrics(tallies)
+    models = examples["model"].to_numpy(zero_copy_only=False)
+    n = examples["rollouts"].to_numpy()
+    c = examples["passes"].to_numpy()
+    columns = {
+        "mean_reward": examples["mean_reward"].to_numpy(),
+        **{f"pass@{k}": pass_at_k(n, c, k) for k in ks},
+        "maj": examples["majority_correct"].to_numpy(zero_copy_only=False).astype(np.float64),
+        "variance": examples["variance"].to_numpy(),
+    }
+    result = {}
+    for model in np.unique(models).tolist():
+        rows = models == model
+        result[model] = {"examples": int(rows.sum()), "rollouts": float(n[rows].mean())}
+        for name, values in columns.items():
+            # pass@k is NaN for examples with fewer than k rollouts.
+            defined = values[rows][~np.isnan(values[rows])]
+            result[model][name] = float(defined.mean()) if defined.size else float("nan")
+    return result
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("-k", type=int, action="append", dest="ks", help="pass@k to report (repeatable)")
+    arg_parser.add_argument("--metric", choices=["reward", "correct"], default="reward")
+    arg_parser.add_argument("--incremental", action="store_true", help=f"update {TALLIES_FILE.name} from new rollouts only")
+    arg_parser.add_argument("--csv", type=Path, help="also write the per-model metrics here")
+    args = arg_parser.parse_args()
+
+    if args.incremental:
+        tallies, new_rollouts = update_tallies()
+        print(f"Read {new_rollouts} new rollout(s) into {TALLIES_FILE}\n")
+    else:
+        ingest()
+        tallies = tallies_from_store()
+    if args.metric == "correct":
+        tallies = rescore_tallies(tallies)
+    per_example = tallies.group_by(EXAMPLE_KEYS).aggregate([("rollouts", "sum")])
+    max_rollouts = pc.max(per_example["rollouts_sum"]).as_py() or 1
+    ks = args.ks or [k for k in (1, 2, 4, 8, 16, 32, 64) if k <= max_rollouts]
+    metrics = model_metrics(tallies, ks)
+
+    columns = ["examples", "rollouts", "mean_reward", *(f"pass@{k}" for k in ks), "maj", "variance"]
+    width = max(len(model) for model in metrics)
+    print(f"{'model':<{width}}  " + "  ".join(f"{c:>{max(len(c), 6)}}" for c in columns))
+    for model, row in metrics.items():
+        cells = [f"{row['examples']:>8}", f"{row['rollouts']:>8.1f}"]
+        cells += [f"{row[c]:>{max(len(c), 6)}.3f}" for c in columns[2:]]
+        print(f"{model:<{width}}  " + "  ".join(cells))
+    if args.csv:
+        lines = [",".join(["model", *columns])]
+        lines += [",".join([model, *(f"{row[c]:.4f}" for c in columns)]) for model, row in metrics.items()]
+        args.csv.write_text("\n".join(lines) + "\n")
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The environment is a single module next to this directory.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
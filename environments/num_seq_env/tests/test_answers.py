@@ -0,0 +1,20 @@
+import pytest
+
+from num_seq_env import _normalize_answer, extract_answer
+
+
+@pytest.mark.parametrize(
+    "text,expected",
+    [(" +1,024. ", "1024"), ("-12,345,678", "-12345678"), ("$ 42 $", "42"), ("−5", "-5")],
+)
+def test_integer_forms_normalize(text, expected):
+    assert _normalize_answer(text) == expected
+
+
+@pytest.mark.parametrize("text", ["3, 4", "1 2", "1,2345", "12,34"])
+def test_lists_do_not_collapse(text):
+    assert _normalize_answer(text) == text
+
+
+def test_list_answer_does_not_match_integer():
+    assert extract_answer("<answer>3, 4</answer>") != "34"
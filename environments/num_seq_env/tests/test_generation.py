@@ -0,0 +1,55 @@
+from num_seq_env import (
+    GenerationStats,
+    _cached_dataset,
+    _generate_dataset,
+    _jump_digits,
+    _jump_term,
+    render_prompts,
+    verify_examples,
+)
+
+
+def test_unbounded_batch_without_wide_rows():
+    # Small orders and windows never outgrow int64, so no row takes the
+    # Python-int path.
+    dataset = _generate_dataset(50, max_abs_value=None, max_k=2, max_start_idx=4, max_lookahead=2)
+    assert len(dataset) == 50
+    assert verify_examples(dataset).all()
+
+
+def test_shard_collisions_do_not_depend_on_workers():
+    # A small example space, so that shards draw some of the same problems.
+    params = dict(num_examples=400, seed=1, num_shards=8, min_k=2, max_k=2, max_start_idx=1, max_lookahead=2)
+    stats = GenerationStats()
+    serial = _generate_dataset(stats=stats, **params)
+    assert sum(by_outcome["duplicate"] for by_outcome in stats.counts.values()) > 0
+    assert len(serial) == 400
+    assert _generate_dataset(num_workers=3, **params).to_list() == serial.to_list()
+
+
+def test_far_jump_answers_stay_within_digit_limit():
+    dataset = _generate_dataset(50, jump_ahead=True, max_lookahead=10_000)
+    assert max(len(answer.lstrip("-")) for answer in dataset["answer"]) <= 4000
+    assert verify_examples(dataset).all()
+
+
+def test_jump_digit_estimate():
+    for coeffs, window in [([1, 1], [1, 1]), ([3, -2, 5], [4, -1, 7]), ([-2, 1, 1, 4, -5], [1, 0, -3, 2, 2])]:
+        digits = len(str(abs(_jump_term(coeffs, window, 3000))))
+        assert abs(_jump_digits(coeffs, window, 3000) - digits) < 5
+
+
+def test_far_lookahead_rejects_cheaply():
+    # Nearly every far target is past the digit limit; without the estimate
+    # each took an exact jump of tens of thousands of digits to reject.
+    dataset = _generate_dataset(20, jump_ahead=True, max_lookahead=100_000)
+    assert max(len(answer.lstrip("-")) for answer in dataset["answer"]) <= 4000
+    assert verify_examples(dataset).all()
+
+
+def test_empty_dataset(tmp_path):
+    dataset = _generate_dataset(0)
+    assert len(dataset) == 0
+    assert len(render_prompts(dataset)) == 0
+    assert not verify_examples(dataset).size
+    assert len(_cached_dataset(tmp_path, num_examples=0, rendered=True)) == 0
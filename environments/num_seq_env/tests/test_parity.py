@@ -0,0 +1,71 @@
+"""Generated datasets and determinants match the original implementation."""
+
+import hashlib
+import json
+import random
+
+import numpy as np
+import pytest
+
+from num_seq_env import _batched_det, _det, _generate_dataset, _hankel_nonsingular, render_prompts
+
+# sha256 prefixes of the [prompt, answer] rows that the original per-candidate
+# generator produced for 200 examples with each (seed, min_k, max_k).
+BASELINE_DIGESTS = {
+    (42, 2, 5): "b6434e5e9c7325c0",
+    (0, 2, 2): "8c06667ff3f9437b",
+    (7, 3, 3): "6093ced730576a62",
+    (123, 2, 4): "52e585acbf3be13b",
+    (1, 5, 5): "222f3c903549db1b",
+    (2024, 4, 5): "3aa6ac25d3727db9",
+}
+
+
+def cofactor_det(matrix: list[list[int]]) -> int:
+    """The original cofactor-expansion determinant."""
+    n = len(matrix)
+    if n == 1:
+        return matrix[0][0]
+    result = 0
+    for col in range(n):
+        minor = [[matrix[r][c] for c in range(n) if c != col] for r in range(1, n)]
+        result += (-1) ** col * matrix[0][col] * cofactor_det(minor)
+    return result
+
+
+@pytest.mark.parametrize("seed,min_k,max_k", list(BASELINE_DIGESTS))
+def test_generation_matches_baseline(seed, min_k, max_k):
+    dataset = render_prompts(_generate_dataset(num_examples=200, seed=seed, min_k=min_k, max_k=max_k))
+    rows = [[row["prompt"], row["answer"]] for row in dataset]
+    digest = hashlib.sha256(json.dumps(rows, sort_keys=True).encode()).hexdigest()[:16]
+    assert digest == BASELINE_DIGESTS[seed, min_k, max_k]
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 4, 5])
+@pytest.mark.parametrize("magnitude", [5, 10**5, 10**12])
+def test_det_matches_cofactor_expansion(n, magnitude):
+    rng = random.Random(n * magnitude)
+    matrices = [[[rng.randint(-magnitude, magnitude) for _ in range(n)] for _ in range(n)] for _ in range(200)]
+    # Rank-deficient matrices: a repeated row and a zero column.
+    for matrix in matrices[:40]:
+        matrix[-1] = list(matrix[0])
+    for matrix in matrices[40:60]:
+        for row in matrix:
+            row[0] = 0
+    expected = [cofactor_det(matrix) for matrix in matrices]
+    assert [_det(matrix) for matrix in matrices] == expected
+    assert _batched_det(np.array(matrices, dtype=np.int64)).tolist() == expected
+
+
+@pytest.mark.parametrize("k", [2, 3, 4, 5])
+def test_hankel_screen_matches_cofactor_expansion(k):
+    rng = np.random.default_rng(k)
+    seqs = rng.integers(-4, 5, size=(500, 2 * k + 4))
+    # Geometric rows give singular Hankel matrices for every k >= 2.
+    seqs[:100] = 2 ** np.arange(seqs.shape[1]) * rng.integers(-3, 4, size=(100, 1))
+    offsets = rng.integers(0, 5, size=500)
+    expected = [
+        cofactor_det([[int(seqs[r, o + i + j]) for j in range(k)] for i in range(k)]) != 0
+        for r, o in enumerate(offsets)
+    ]
+    assert _hankel_nonsingular(seqs, offsets, k).tolist() == expected
@@ -0,0 +1,40 @@
+import json
+import os
+
+import results_store
+from results_store import ingest, load
+
+PROMPT = [{"role": "user", "content": "Here are terms 1 through 4 of a sequence:\n1, 2, 4, 8\n\nWhat is term 11 of the sequence?"}]
+
+
+def write_results(results_file, reply: str, answer: str = "1,024") -> None:
+    record = {
+        "example_id": 0,
+        "prompt": PROMPT,
+        "completion": [{"role": "assistant", "content": f"<answer>{reply}</answer>"}],
+        "answer": answer,
+        "reward": 0.0,
+    }
+    results_file.write_text(json.dumps(record) + "\n")
+
+
+def test_reingests_on_content_or_version_change(tmp_path, monkeypatch):
+    evals_dir, store_dir = tmp_path / "evals", tmp_path / "store"
+    results_file = evals_dir / "num-seq-env--org--model" / "run-a" / "results.jsonl"
+    results_file.parent.mkdir(parents=True)
+    write_results(results_file, "1024")
+    assert len(ingest(evals_dir, store_dir)) == 1
+    assert ingest(evals_dir, store_dir) == []
+    # The ground truth is normalized like the parsed answer.
+    assert load(["correct"], store_dir=store_dir)["correct"].to_pylist() == [True]
+
+    # Same size and mtime, different content.
+    stat = results_file.stat()
+    write_results(results_file, "1025")
+    os.utime(results_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert len(ingest(evals_dir, store_dir)) == 1
+    assert load(["correct"], store_dir=store_dir)["correct"].to_pylist() == [False]
+
+    monkeypatch.setattr(results_store, "STORE_VERSION", results_store.STORE_VERSION + 1)
+    assert len(ingest(evals_dir, store_dir)) == 1
+    assert ingest(evals_dir, store_dir) == []
@@ -0,0 +1,52 @@
+import json
+
+import pyarrow.compute as pc
+
+from rollout_metrics import example_metrics, model_metrics, tallies_from_store, update_tallies
+from results_store import ingest
+
+
+def rollout(example_id: int, answer: str, reply: str) -> dict:
+    prompt = (
+        "Here are terms 1 through 4 of a sequence:\n1, 2, 4, 8\n\n"
+        f"What is term {5 + example_id} of the sequence?"
+    )
+    return {
+        "example_id": example_id,
+        "prompt": [{"role": "user", "content": prompt}],
+        "completion": [{"role": "assistant", "content": f"<answer>{reply}</answer>"}],
+        "answer": answer,
+        "reward": float(reply == answer),
+    }
+
+
+def write_run(run_dir, records, mode="w"):
+    run_dir.mkdir(parents=True, exist_ok=True)
+    (run_dir / "metadata.json").write_text(json.dumps({"model": "org/model"}))
+    with open(run_dir / "results.jsonl", mode) as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+
+
+def test_incremental_tallies_match_a_full_recompute(tmp_path):
+    evals_dir, tallies_file = tmp_path / "evals", tmp_path / "tallies.parquet"
+    # Two runs of one model whose datasets reuse example_ids for different problems.
+    first = evals_dir / "num-seq-env--org--model" / "run-a"
+    second = evals_dir / "num-seq-env--org--model" / "run-b"
+    write_run(first, [rollout(0, "16", "16"), rollout(0, "16", "16"), rollout(1, "32", "7")])
+    write_run(second, [rollout(0, "99", "16")])
+    update_tallies(evals_dir, tallies_file)
+    write_run(first, [rollout(1, "32", "32")], mode="a")
+    write_run(second, [rollout(0, "99", "16"), rollout(0, "99", "99"), rollout(1, "5", "5")], mode="a")
+    incremental, new_rollouts = update_tallies(evals_dir, tallies_file)
+    assert new_rollouts == 4
+
+    ingest(evals_dir, tmp_path / "store")
+    full = tallies_from_store(tmp_path / "store")
+    assert example_metrics(incremental).to_pylist() == example_metrics(full).to_pylist()
+    assert model_metrics(incremental, [1, 2]) == model_metrics(full, [1, 2])
+
+    examples = example_metrics(full)
+    assert examples.num_rows == 4
+    # run-b's example 0 is a miss by majority even though "16" was run-a's answer.
+    majority = examples.filter(pc.field("run_id") == "run-b").filter(pc.field("example_id") == 0)
+    assert majority["majority_correct"].to_pylist() == [False]
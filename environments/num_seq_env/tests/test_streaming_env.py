@@ -0,0 +1,52 @@
+import asyncio
+
+from num_seq_env import load_environment
+
+
+def orchestrator_batches(env, prompts_per_batch: int, num_batches: int):
+    """The dataset access pattern of verifiers' RL orchestrator."""
+    env.dataset = env.dataset.filter(lambda example, max_len: len(example["prompt"]) <= max_len, fn_kwargs={"max_len": 8})
+    for batch_id in range(num_batches):
+        # Orchestrator.get_dataset_slice
+        dataset = env.get_dataset()
+        total_rows = len(dataset)
+        offset = (batch_id * prompts_per_batch) % total_rows
+        yield dataset.select([(offset + i) % total_rows for i in range(prompts_per_batch)])
+
+
+def test_trainer_pulls_continue_the_stream():
+    env = load_environment(streaming=True, num_examples=16)
+    batches = list(orchestrator_batches(env, prompts_per_batch=6, num_batches=5))
+    ids = [example_id for batch in batches for example_id in batch["example_id"]]
+    assert ids == list(range(30))
+    prompts = [str(prompt) for batch in batches for prompt in batch["prompt"]]
+    assert len(set(prompts)) == len(prompts)
+    assert {"prompt", "answer", "info", "task"} <= set(batches[0].column_names)
+
+
+def test_evaluation_takes_fresh_examples():
+    env = load_environment(streaming=True, num_examples=16)
+    first, second = env.get_dataset(n=5), env.get_eval_dataset(n=5)
+    assert len(first) == len(second) == 5
+    assert list(first["example_id"]) + list(second["example_id"]) == list(range(10))
+
+
+def test_curriculum_rewards_shift_the_mix():
+    env = load_environment(curriculum=True, num_examples=200, seed=0, max_lookahead=4)
+    (exact_match,) = [func for rubric in env.rubric.rubrics for func in rubric.funcs if func.__name__ == "exact_match"]
+
+    async def score(batch):
+        # A policy that has mastered k = 2 and solves everything else half the time.
+        for example in batch:
+            solved = example["info"]["k"] == 2 or example["example_id"] % 2
+            completion = [{"role": "assistant", "content": f"<answer>{example['answer'] if solved else 'x'}</answer>"}]
+            await exact_match(completion=completion, answer=example["answer"], info=example["info"])
+
+    ids, shares = [], []
+    for batch in orchestrator_batches(env, prompts_per_batch=200, num_batches=5):
+        batch = batch.to_list()
+        ids += [example["example_id"] for example in batch]
+        shares.append(sum(example["info"]["k"] == 2 for example in batch) / len(batch))
+        asyncio.run(score(batch))
+    assert ids == list(range(1000))
+    assert shares[-1] < 0.6 * shares[0]
@@ -0,0 +1,66 @@
+import pytest
+
+from num_seq_env import StreamingScorer, extract_answer
+
+ECHOED_TEMPLATE = "I must answer in <answer>\n...\n</answer> format. The next term is 42.\n<answer>\n42\n</answer>"
+REVISED = "<answer>41</answer>? no wait, I dropped a term. <answer>42</answer>"
+FORMATTED = "<reasoning>\nIt doubles, so\n<answer>\n...\n</answer>\nholds 2 * 21.\n</reasoning>\n<answer>\n42\n</answer>"
+
+
+def stream(scorer: StreamingScorer, text: str, chunk_size: int = 5) -> float:
+    for i in range(0, len(text), chunk_size):
+        if scorer.feed(text[i : i + chunk_size]):
+            break
+    return scorer.finish()
+
+
+@pytest.mark.parametrize("text", [ECHOED_TEMPLATE, REVISED])
+def test_last_answer_block_wins(text):
+    assert extract_answer(text) == "42"
+    scorer = StreamingScorer("42")
+    assert stream(scorer, text) == 1.0
+    assert scorer.stop_reason == "answer"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1000])
+def test_answer_after_reasoning_stops_stream(chunk_size):
+    scorer = StreamingScorer("42")
+    text = FORMATTED + "\nTo double-check, " + "let me recount. " * 50
+    chunks = [text[i : i + chunk_size] for i in range(0, len(text), chunk_size)]
+    stopped = next(i for i, chunk in enumerate(chunks) if scorer.feed(chunk))
+    # The chunk that closes the final block.
+    assert stopped == (len(FORMATTED) - 1) // chunk_size
+    assert scorer.finish() == 1.0
+    assert scorer.stop_reason == "answer"
+
+
+@pytest.mark.parametrize(
+    "text,options",
+    [
+        (ECHOED_TEMPLATE, {}),
+        (REVISED, {}),
+        ("<reasoning>2 * 21</reasoning><answer>\n...\n</answer>", {}),
+        (FORMATTED, {"stop_on_answer": False}),
+    ],
+)
+def test_closed_block_does_not_stop_stream(text, options):
+    scorer = StreamingScorer("42", **options)
+    assert not any(scorer.feed(text[i : i + 5]) for i in range(0, len(text), 5))
+
+
+def test_repetition_scores_text_so_far():
+    scorer = StreamingScorer("7", repeat_window=4, repeat_count=4)
+    assert stream(scorer, "<answer>7</answer>" + "loop" * 100) == 1.0
+    assert scorer.stop_reason == "repetition"
+
+
+def test_too_long_without_answer():
+    scorer = StreamingScorer("7", max_chars=100)
+    assert stream(scorer, "".join(f"step {i}; " for i in range(100))) == 0.0
+    assert scorer.stop_reason == "too_long"
+
+
+def test_non_integer_final_block():
+    scorer = StreamingScorer("7")
+    assert stream(scorer, "<answer>7</answer> or <answer>seven</answer>") == 0.0
+    assert scorer.stop_reason is None
@@ -0,0 +1,73 @@
+"""Minimal OpenAI-compatible chat completions server for testing run_evals.py offline.
+
+Every request gets a fixed <answer> after an optional delay, and a fraction
+of requests fail with 429 or 500 to exercise client retries.
+
+    python mock_openai_server.py --port 8011 --latency 0.05 --fail-rate 0.2
+"""
+
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    fail_rate = 0.0
+    answer = "0"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if not self.path.endswith("/chat/completions"):
+            return self.reply(404, {"error": {"message": f"unknown path {self.path}"}})
+        time.sleep(self.latency)
+        if random.random() < self.fail_rate:
+            status = random.choice([429, 500])
+            return self.reply(status, {"error": {"message": "injected failure"}})
+        content = f"<reasoning>\nmock\n</reasoning>\n<answer>\n{self.answer}\n</answer>"
+        self.reply(
+            200,
+            {
+                "id": "mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            },
+        )
+
+    def reply(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--port", type=int, default=8011)
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="seconds per response")
+    arg_parser.add_argument("--fail-rate", type=float, default=0.0)
+    arg_parser.add_argument("--answer", default="0")
+    args = arg_parser.parse_args()
+
+    MockHandler.latency = args.latency
+    MockHandler.fail_rate = args.fail_rate
+    MockHandler.answer = args.answer
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), MockHandler)
+    print(f"Mock OpenAI server on http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
@@ -0,0 +1,264 @@
+"""Run num-seq-env evals for several models concurrently.
+
+Replaces running `prime eval run` once per model in sequence. The dataset is
+built once and shared by every model, and requests fan out across models
+under per-model and per-endpoint concurrency limits, with one pooled client
+per endpoint. Transient API errors are retried with exponential backoff, and
+each model's results.jsonl is appended as rollouts finish, so an interrupted
+run resumes where it stopped.
+
+Models are endpoint aliases from configs/endpoints.py or raw model ids, which
+go to the Prime inference endpoint. Point everything at a local server, e.g.
+mock_openai_server.py, with --base-url.
+
+    python run_evals.py -n 100 -c 10
+    python mock_openai_server.py --port 8011 &
+    python run_evals.py -n 20 --base-url http://127.0.0.1:8011/v1 --output-dir /tmp/evals
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from openai import APIConnectionError, APIStatusError, AsyncOpenAI, RateLimitError
+
+ROOT = Path(__file__).parent
+ENV_DIR = ROOT / "environments" / "num_seq_env"
+sys.path.insert(0, str(ROOT / "configs"))
+sys.path.insert(0, str(ENV_DIR))
+
+from endpoints import ENDPOINTS  # noqa: E402
+from num_seq_env import load_environment, score_completions  # noqa: E402
+
+ENV_ID = "num-seq-env"
+OUTPUT_DIR = ENV_DIR / "outputs" / "evals"
+DEFAULT_URL = "https://api.pinference.ai/api/v1"
+DEFAULT_KEY = "PRIME_API_KEY"
+
+MODELS = [
+    "allenai/olmo-3.1-32b-think",
+    "qwen/qwen3-vl-30b-a3b-thinking",
+    "prime-intellect/intellect-3",
+    "openai/gpt-4.1-mini",
+    "openai/gpt-4.1",
+]
+
+MAX_BACKOFF_S = 60.0
+
+
+def resolve(name: str, base_url: str | None) -> tuple[str, str, str]:
+    """(model id, base url, api key env var) for an endpoint alias or model id."""
+    endpoint = ENDPOINTS.get(name, {"model": name, "url": DEFAULT_URL, "key": DEFAULT_KEY})
+    return endpoint["model"], base_url or endpoint["url"], endpoint["key"]
+
+
+def run_dir(output_dir: Path, model: str, run_spec: dict) -> Path:
+    """Deterministic results directory, so rerunning the same eval resumes it."""
+    run_id = hashlib.sha256(json.dumps(run_spec, sort_keys=True).encode()).hexdigest()[:8]
+    return output_dir / f"{ENV_ID}--{model.replace('/', '--')}" / run_id
+
+
+def load_done(results_file: Path) -> dict[int, int]:
+    """Rollouts already written per example_id, dropping a torn final line."""
+    done: dict[int, int] = {}
+    if not results_file.exists():
+        return done
+    data = results_file.read_bytes()
+    complete = data[: data.rfind(b"\n") + 1]
+    if len(complete) != len(data):
+        with open(results_file, "r+b") as f:
+            f.truncate(len(complete))
+    for line in complete.splitlines():
+        eid = json.loads(line)["example_id"]
+        done[eid] = done.get(eid, 0) + 1
+    return done
+
+
+def is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, (APIConnectionError, RateLimitError)):
+        return True
+    return isinstance(exc, APIStatusError) and exc.status_code >= 500
+
+
+async def complete(
+    client: AsyncOpenAI,
+    limits: tuple[asyncio.Semaphore, asyncio.Semaphore],
+    model: str,
+    prompt: list[dict],
+    sampling_args: dict,
+    max_retries: int,
+) -> str:
+    """One chat completion under the model and endpoint limits, with retries."""
+    model_limit, endpoint_limit = limits
+    for attempt in range(max_retries + 1):
+        try:
+            async with model_limit, endpoint_limit:
+                response = await client.chat.completions.create(
+                    model=model, messages=prompt, **sampling_args
+                )
+            return response.choices[0].message.content or ""
+        except Exception as exc:
+            if attempt == max_retries or not is_retryable(exc):
+                raise
+            delay = min(MAX_BACKOFF_S, 2**attempt) * (0.5 + random.random())
+            await asyncio.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+async def eval_model(
+    name: str,
+    examples: list[dict],
+    clients: dict[tuple[str, str], AsyncOpenAI],
+    endpoint_limits: dict[str, asyncio.Semaphore],
+    args: argparse.Namespace,
+) -> None:
+    model, url, key = resolve(name, args.base_url)
+    sampling_args = {"n": 1, "extra_body": {}}
+    if args.max_tokens is not None:
+        sampling_args["max_tokens"] = args.max_tokens
+    if args.temperature is not None:
+        sampling_args["temperature"] = args.temperature
+    run_spec = {
+        "model": model,
+        "base_url": url,
+        "env_args": args.env_args,
+        "num_examples": args.num_examples,
+        "rollouts_per_example": args.rollouts_per_example,
+        "sampling_args": sampling_args,
+    }
+    out = run_dir(args.output_dir, model, run_spec)
+    out.mkdir(parents=True, exist_ok=True)
+    results_file = out / "results.jsonl"
+    done = load_done(results_file)
+
+    todo = [
+        ex
+        for ex in examples
+        for _ in range(args.rollouts_per_example - done.get(ex["example_id"], 0))
+    ]
+    print(f"{model}: {len(todo)} rollouts to run, {sum(done.values())} already in {out}")
+
+    client = clients[(url, key)]
+    limits = (asyncio.Semaphore(args.concurrency), endpoint_limits[url])
+    request_args = {k: v for k, v in sampling_args.items() if k != "n"}
+    t0 = time.perf_counter()
+    failures = 0
+
+    with open(results_file, "a") as f:
+
+        async def rollout(ex: dict) -> None:
+            nonlocal failures
+            start = time.perf_counter()
+            try:
+                content = await complete(
+                    client, limits, model, ex["prompt"], request_args, args.max_retries
+                )
+            except Exception as exc:
+                # Not written, so the next run retries it.
+                failures += 1
+                print(f"{model}: example {ex['example_id']} failed: {exc!r}")
+                return
+            generated = time.perf_counter()
+            completion = [{"role": "assistant", "content": content}]
+            reward = score_completions([completion], [ex["answer"]])[0]
+            scored = time.perf_counter()
+            record = {
+                "example_id": ex["example_id"],
+                "prompt": ex["prompt"],
+                "completion": completion,
+                "task": ex["task"],
+                "info": ex["info"],
+                "reward": reward,
+                "error": None,
+                "generation_ms": (generated - start) * 1000,
+                "scoring_ms": (scored - generated) * 1000,
+                "total_ms": (scored - start) * 1000,
+                "answer": ex["answer"],
+                "exact_match": reward,
+                "num_turns": 1.0,
+            }
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+
+        await asyncio.gather(*(rollout(ex) for ex in todo))
+
+    rewards = [json.loads(line)["reward"] for line in open(results_file)]
+    avg_reward = sum(rewards) / len(rewards) if rewards else 0.0
+    metadata = {
+        "env_id": ENV_ID,
+        "env_args": args.env_args,
+        "model": model,
+        "base_url": url,
+        "num_examples": args.num_examples,
+        "rollouts_per_example": args.rollouts_per_example,
+        "sampling_args": sampling_args,
+        "time_ms": (time.perf_counter() - t0) * 1000,
+        "avg_reward": avg_reward,
+        "avg_metrics": {"exact_match": avg_reward, "num_turns": 1.0},
+        "state_columns": [],
+    }
+    (out / "metadata.json").write_text(json.dumps(metadata))
+    status = f", {failures} failed (rerun to retry)" if failures else ""
+    print(f"{model}: avg_reward {avg_reward:.3f} over {len(rewards)} rollouts{status}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    # Build the dataset once; every model is evaluated on the same rows.
+    env = load_environment(**args.env_args)
+    examples = env.get_eval_dataset(n=args.num_examples).to_list()
+
+    endpoints = {resolve(name, args.base_url)[1:] for name in args.models}
+    # Unless capped, an endpoint allows every model on it its full concurrency.
+    endpoint_concurrency = {
+        url: args.endpoint_concurrency
+        or args.concurrency * sum(resolve(name, args.base_url)[1] == url for name in args.models)
+        for url, _ in endpoints
+    }
+    clients = {}
+    for url, key in endpoints:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=endpoint_concurrency[url],
+                max_keepalive_connections=endpoint_concurrency[url],
+            ),
+            timeout=httpx.Timeout(args.timeout),
+        )
+        clients[(url, key)] = AsyncOpenAI(
+            base_url=url,
+            api_key=os.environ.get(key, "EMPTY"),
+            http_client=http_client,
+            max_retries=0,
+        )
+    endpoint_limits = {url: asyncio.Semaphore(n) for url, n in endpoint_concurrency.items()}
+
+    try:
+        await asyncio.gather(
+            *(eval_model(name, examples, clients, endpoint_limits, args) for name in args.models)
+        )
+    finally:
+        for client in clients.values():
+            await client.close()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("models", nargs="*", default=MODELS)
+    arg_parser.add_argument("-n", "--num-examples", type=int, default=100)
+    arg_parser.add_argument("-r", "--rollouts-per-example", type=int, default=1)
+    arg_parser.add_argument("-c", "--concurrency", type=int, default=10, help="max in-flight requests per model")
+    arg_parser.add_argument("--endpoint-concurrency", type=int, help="cap on in-flight requests per endpoint URL")
+    arg_parser.add_argument("-a", "--env-args", type=json.loads, default={})
+    arg_parser.add_argument("-t", "--max-tokens", type=int)
+    arg_parser.add_argument("-T", "--temperature", type=float)
+    arg_parser.add_argument("--max-retries", type=int, default=5)
+    arg_parser.add_argument("--timeout", type=float, default=1800.0, help="per-request timeout in seconds")
+    arg_parser.add_argument("--base-url", help="send every model to this endpoint instead")
+    arg_parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    asyncio.run(main(arg_parser.parse_args()))